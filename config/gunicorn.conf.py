@@ -0,0 +1,32 @@
+"""
+Профиль gunicorn для продакшена.
+
+ASGI (асинхронные view, HABITS_ASYNC_VIEWS=True):
+    gunicorn -c config/gunicorn.conf.py config.asgi:application
+WSGI с потоками, для сравнения:
+    GUNICORN_WORKER_CLASS=gthread gunicorn -c config/gunicorn.conf.py config.wsgi:application
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND") or "0.0.0.0:8000"
+workers = int(os.getenv("GUNICORN_WORKERS") or multiprocessing.cpu_count() * 2 + 1)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS") or "uvicorn_worker.UvicornWorker"
+# Используется только gthread-воркерами WSGI
+threads = int(os.getenv("GUNICORN_THREADS") or 8)
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or 30)
+graceful_timeout = timeout
+keepalive = 5
+# Перезапуск воркеров ограничивает рост памяти из-за фрагментации
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS") or 5000)
+max_requests_jitter = max_requests // 10
+
+
+def child_exit(server, worker):
+    # Метрики завершенного воркера больше не попадают в /metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
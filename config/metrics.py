@@ -0,0 +1,171 @@
+import ipaddress
+import os
+
+from django.core.signals import request_finished
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+
+from config.settings import DB_POOL, METRICS_ALLOWED_IPS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Время SQL-запросов за один запрос",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов за один запрос",
+    ["route", "method"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+RENDER_DURATION = Histogram(
+    "http_request_render_duration_seconds",
+    "Время рендеринга ответа",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Состояние пулов соединений складывается по живым процессам: сумма in_use и max_size
+# по всем воркерам сравнивается с max_connections Postgres
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Соединения пула: in_use - выданы, idle - свободны",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_MAX_SIZE = Gauge(
+    "db_pool_max_size",
+    "Максимальный размер пула",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAITING = Gauge(
+    "db_pool_requests_waiting",
+    "Запросы, ожидающие свободного соединения",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_REQUESTS = Counter("db_pool_requests", "Выдачи соединений из пула", ["alias"])
+DB_POOL_QUEUED = Counter(
+    "db_pool_requests_queued", "Выдачи, которым пришлось ждать соединения", ["alias"]
+)
+DB_POOL_WAIT = Counter(
+    "db_pool_wait_seconds", "Суммарное время ожидания соединения", ["alias"]
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts", "Запросы, не дождавшиеся соединения", ["alias"]
+)
+DB_POOL_LOST = Counter(
+    "db_pool_connections_lost",
+    "Соединения, отбракованные проверкой при выдаче",
+    ["alias"],
+)
+
+
+def collect_pool_stats(**kwargs):
+    """
+    Перенос статистики пулов соединений процесса в метрики. pop_stats() обнуляет
+    счетчики пула, поэтому приращения не теряются и не учитываются дважды.
+    """
+    for connection in connections.all():
+        pool = getattr(connection, "pool", None)
+        if pool is None:
+            continue
+        stats = pool.pop_stats()
+        alias = connection.alias
+        in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+        DB_POOL_CONNECTIONS.labels(alias, "in_use").set(in_use)
+        DB_POOL_CONNECTIONS.labels(alias, "idle").set(stats.get("pool_available", 0))
+        DB_POOL_MAX_SIZE.labels(alias).set(stats.get("pool_max", 0))
+        DB_POOL_WAITING.labels(alias).set(stats.get("requests_waiting", 0))
+        DB_POOL_REQUESTS.labels(alias).inc(stats.get("requests_num", 0))
+        DB_POOL_QUEUED.labels(alias).inc(stats.get("requests_queued", 0))
+        DB_POOL_WAIT.labels(alias).inc(stats.get("requests_wait_ms", 0) / 1000)
+        DB_POOL_TIMEOUTS.labels(alias).inc(stats.get("requests_errors", 0))
+        DB_POOL_LOST.labels(alias).inc(stats.get("connections_lost", 0))
+
+
+if DB_POOL:
+    # После закрытия соединений запроса, когда соединение уже вернулось в пул
+    request_finished.connect(collect_pool_stats, dispatch_uid="collect_pool_stats")
+
+
+class PublicFeedCacheCollector:
+    """Счетчики кэша публичной ленты из общего кэша, одинаковые для всех воркеров."""
+
+    def collect(self):
+        from habits.cache import get_stats
+
+        metric = CounterMetricFamily(
+            "public_habits_cache",
+            "Обращения к кэшу публичной ленты по результату",
+            labels=["result"],
+        )
+        for result, value in get_stats().items():
+            metric.add_metric([result], value)
+        yield metric
+
+
+REGISTRY.register(PublicFeedCacheCollector())
+
+
+METRICS_NETWORKS = [
+    ipaddress.ip_network(address.strip(), strict=False)
+    for address in METRICS_ALLOWED_IPS
+    if address.strip()
+]
+
+
+class IsMetricsClient(BasePermission):
+    """Доступ к метрикам: адрес из METRICS_ALLOWED_IPS или сотрудник."""
+
+    def has_permission(self, request, view):
+        try:
+            address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+        except ValueError:
+            address = None
+        if address is not None and any(address in net for net in METRICS_NETWORKS):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+class MetricsAPIView(APIView):
+    """Метрики в текстовом формате Prometheus."""
+
+    permission_classes = (IsMetricsClient,)
+    swagger_schema = None
+
+    def get(self, request):
+        collect_pool_stats()
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            registry.register(PublicFeedCacheCollector())
+        else:
+            registry = REGISTRY
+        return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+metrics = MetricsAPIView.as_view()
@@ -0,0 +1,132 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from config.metrics import DB_DURATION, DB_QUERIES, RENDER_DURATION, REQUEST_DURATION
+
+
+class QueryTimer:
+    """Обертка выполнения SQL: считает запросы и их суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+# Таймер текущего запроса. Под ASGI SQL выполняется в потоке sync_to_async со своим
+# соединением, контекст запроса копируется туда вместе с таймером
+current_timer = ContextVar("current_timer", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """Обертка ставится первой и навсегда, execute_wrapper() снимает только свои."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def install_query_recorders():
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+# Соединения потоков, открытые после загрузки middleware
+connection_created.connect(install_query_recorder)
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет время SQL, view и рендеринга ответа. Результат отдается в заголовке
+    Server-Timing и в гистограммах /metrics с меткой имени маршрута (habits:habits_list).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Под ASGI цепочка middleware остается асинхронной, и async view не уходят в поток
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Соединения, открытые до загрузки middleware (например, в manage.py shell)
+        install_query_recorders()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_query_recorders()
+        timer, started = self.start(request)
+        token = current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        timer, started = self.start(request)
+        token = current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer, started)
+
+    def start(self, request):
+        request._timing = {"view_started": None, "view": 0.0, "render": 0.0}
+        return QueryTimer(), time.perf_counter()
+
+    def finish(self, request, response, timer, started):
+        total = time.perf_counter() - started
+        timing = request._timing
+        if timing["view_started"] is not None and not timing["view"]:
+            timing["view"] = total - (timing["view_started"] - started)
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} queries"',
+                f"view;dur={timing['view'] * 1000:.2f}",
+                f"render;dur={timing['render'] * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            ]
+        )
+
+        match = request.resolver_match
+        labels = (match.view_name if match else "unmatched", request.method)
+        REQUEST_DURATION.labels(*labels).observe(total)
+        DB_DURATION.labels(*labels).observe(timer.duration)
+        DB_QUERIES.labels(*labels).observe(timer.count)
+        RENDER_DURATION.labels(*labels).observe(timing["render"])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing["view_started"] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # View вернул ответ DRF, который рендерится после всех middleware
+        timing = request._timing
+        timing["view"] = time.perf_counter() - timing["view_started"]
+        render_started = time.perf_counter()
+
+        def finish_render(response):
+            timing["render"] = time.perf_counter() - render_started
+
+        response.add_post_render_callback(finish_render)
+        return response
@@ -2,6 +2,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,7 +67,7 @@ WSGI_APPLICATION = "config.wsgi.application"
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -91,6 +93,27 @@ DATABASES = {
     }
 }
 
+# Пул соединений psycopg 3 для веб-процессов и воркеров Celery. Пул свой в каждом
+# процессе, поэтому соединений к Postgres до DB_POOL_MAX_SIZE на процесс
+DB_POOL = True if os.getenv("DB_POOL") == "True" else False
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE") or 2)
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE") or 10)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or 10)
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME") or 1800)
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE") or 300)
+if DB_POOL:
+    # Проверка соединения при выдаче из пула
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+            "max_lifetime": DB_POOL_MAX_LIFETIME,
+            "max_idle": DB_POOL_MAX_IDLE,
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -149,6 +172,40 @@ CORS_ALLOW_ALL_ORIGINS = False
 
 REDIS_URL = os.getenv("REDIS_URL")
 
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+PUBLIC_FEED_CACHE_TTL = int(os.getenv("PUBLIC_FEED_CACHE_TTL") or 60)
+PUBLIC_FEED_STALE_TTL = int(os.getenv("PUBLIC_FEED_STALE_TTL") or 600)
+
+# Кэш пользователей JWT-аутентификации: общий в Redis (не дольше жизни токена)
+# и LRU в памяти процесса, изменения пользователя видны в других процессах
+# не позже AUTH_USER_LOCAL_TTL секунд
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL") or 300)
+AUTH_USER_LOCAL_TTL = float(os.getenv("AUTH_USER_LOCAL_TTL") or 5)
+AUTH_USER_LOCAL_SIZE = int(os.getenv("AUTH_USER_LOCAL_SIZE") or 1024)
+
+# /metrics без авторизации отдается только с этих адресов и подсетей (сервер
+# Prometheus), сотрудникам - с любого адреса; адрес берется из REMOTE_ADDR
+METRICS_ALLOWED_IPS = (os.getenv("METRICS_ALLOWED_IPS") or "127.0.0.1,::1").split(",")
+
+# Миниатюры аватаров (сторона квадрата в пикселях), строятся фоновой задачей
+AVATAR_THUMBNAIL_SIZES = {
+    "small": int(os.getenv("AVATAR_SMALL_SIZE") or 64),
+    "medium": int(os.getenv("AVATAR_MEDIUM_SIZE") or 256),
+}
+
 STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
 
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
@@ -156,16 +213,73 @@ CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+CELERY_RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES") or 60 * 60)
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(
+    os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER") or 1
+)
+
+# Отправка напоминаний ждет Telegram и идет в отдельную очередь, которую читает
+# воркер с пулом eventlet; остальные задачи остаются в очереди default на prefork.
+# Работа с БД (захват и запись outbox, привязка чата) остается в default: psycopg 3
+# не умеет ждать сокет через eventlet и блокирует весь воркер, а соединение с БД
+# там открывается на каждый гринлет
+CELERY_TASK_DEFAULT_QUEUE = "default"
+REMINDERS_QUEUE = "reminders"
+REMINDERS_IGNORE_RESULT = (
+    False if os.getenv("REMINDERS_IGNORE_RESULT") == "False" else True
+)
+CELERY_TASK_ROUTES = {
+    "habits.tasks.send_reminder_with_bot": {"queue": REMINDERS_QUEUE},
+    "habits.tasks.send_reminders_batch": {"queue": REMINDERS_QUEUE},
+    "habits.tasks.send_outbox_batch": {"queue": REMINDERS_QUEUE},
+}
+CELERY_TASK_ANNOTATIONS = {
+    "habits.tasks.send_reminder_with_bot": {"ignore_result": REMINDERS_IGNORE_RESULT},
+    "habits.tasks.send_reminders_batch": {"ignore_result": REMINDERS_IGNORE_RESULT},
+}
 
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 CELERY_BEAT_SCHEDULE = {
-    "send_reminder_with_bot": {
-        "task": "habits.tasks.send_reminder_with_bot",
-        "schedule": timedelta(days=1),
+    "dispatch_due_reminders": {
+        "task": "habits.tasks.dispatch_due_reminders",
+        "schedule": crontab(minute="*"),
+    },
+    "send_outbox": {
+        "task": "habits.tasks.send_outbox",
+        "schedule": float(os.getenv("OUTBOX_POLL_INTERVAL") or 15),
+    },
+    "purge_outbox": {
+        "task": "habits.tasks.purge_outbox",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "flush_checkins": {
+        "task": "habits.tasks.flush_checkins",
+        "schedule": float(os.getenv("CHECKIN_FLUSH_INTERVAL") or 5),
+    },
+    "refresh_popularity": {
+        "task": "habits.tasks.refresh_popularity",
+        "schedule": float(os.getenv("POPULARITY_REFRESH_INTERVAL") or 60),
     },
 }
 
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE") or 500)
+REMINDER_MAX_DELAY = timedelta(minutes=int(os.getenv("REMINDER_MAX_DELAY") or 15))
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY") or 50)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE") or 200)
+OUTBOX_LEASE = timedelta(seconds=int(os.getenv("OUTBOX_LEASE") or 120))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS") or 5)
+OUTBOX_RETRY_BASE = timedelta(seconds=int(os.getenv("OUTBOX_RETRY_BASE") or 30))
+OUTBOX_RETENTION = timedelta(days=int(os.getenv("OUTBOX_RETENTION_DAYS") or 7))
+
+CHECKIN_BATCH_SIZE = int(os.getenv("CHECKIN_BATCH_SIZE") or 5000)
+POPULARITY_BATCH_SIZE = int(os.getenv("POPULARITY_BATCH_SIZE") or 1000)
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE") or 2000)
+# Асинхронные view списков и просмотра привычек, включается при запуске под ASGI
+HABITS_ASYNC_VIEWS = True if os.getenv("HABITS_ASYNC_VIEWS") == "True" else False
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT"))
@@ -177,3 +291,9 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_URL = "https://api.telegram.org/bot"
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT") or 10)
+TELEGRAM_RATE_LIMIT = int(os.getenv("TELEGRAM_RATE_LIMIT") or 30)
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE") or 10)
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES") or 3)
+# Секрет вебхука, Telegram присылает его в заголовке X-Telegram-Bot-Api-Secret-Token
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
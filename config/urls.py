@@ -6,6 +6,7 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
 from config import settings
+from config.metrics import metrics
 from user.views import CustomTokenObtainPairView
 
 schema_view = get_schema_view(
@@ -26,6 +27,7 @@ urlpatterns = [
     path("user/", include("user.urls", namespace="user")),
     path("habits/", include("habits.urls", namespace="habits")),
     path("login/", CustomTokenObtainPairView.as_view(), name="login"),
+    path("metrics", metrics, name="metrics"),
     path("token/refresh/", CustomTokenObtainPairView.as_view(), name="token_refresh"),
     path(
         "swagger/",
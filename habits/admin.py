@@ -1,9 +1,22 @@
 from django.contrib import admin
 
-from habits.models import Habit
+from habits.models import Habit, HabitCompletion, NotificationOutbox
 
 
 @admin.register(Habit)
 class HabitAdmin(admin.ModelAdmin):
     class Meta:
         list_filter = ("id", "action")
+
+
+@admin.register(HabitCompletion)
+class HabitCompletionAdmin(admin.ModelAdmin):
+    list_display = ("habit", "day", "completed_at")
+    raw_id_fields = ("habit",)
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ("habit", "scheduled_for", "status", "attempts", "sent_at")
+    list_filter = ("status",)
+    raw_id_fields = ("habit",)
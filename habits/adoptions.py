@@ -0,0 +1,82 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers
+
+from config.settings import POPULARITY_BATCH_SIZE
+from habits.cache import invalidate_public_feed
+from habits.models import Habit
+
+COPIED_FIELDS = (
+    "action",
+    "location",
+    "time_deadline",
+    "is_enjoyable",
+    "periodicity",
+    "reward",
+    "time_to_complete",
+)
+
+
+def copy_habit(habit, owner, **extra):
+    copy = Habit(owner=owner, adopted_from=habit, date_deadline=timezone.localdate())
+    for field in COPIED_FIELDS:
+        setattr(copy, field, getattr(habit, field))
+    for field, value in extra.items():
+        setattr(copy, field, value)
+    copy.save()
+    return copy
+
+
+def adopt_habit(habit, owner):
+    """
+    Копия публичной привычки в список пользователя (непубличная, с сегодняшней даты).
+    Связанная приятная привычка копируется вместе с ней, только если она тоже
+    публичная и активная; если пользователь уже добавлял ее раньше, используется
+    прежняя копия. Счетчик добавлений исходной привычки растет в той же транзакции;
+    рейтинг популярности пересчитывает задача refresh_popularity.
+    """
+    if habit.owner_id == owner.pk:
+        raise serializers.ValidationError("Это Ваша привычка.")
+
+    try:
+        with transaction.atomic():
+            associated = None
+            # Непубличная приятная привычка автора остается у автора
+            linked = habit.associated_habit
+            if linked is not None and linked.is_public and linked.is_active:
+                associated = Habit.objects.filter(
+                    owner=owner, adopted_from=habit.associated_habit_id
+                ).first() or copy_habit(linked, owner)
+            copy = copy_habit(habit, owner, associated_habit=associated)
+            Habit.objects.filter(pk=habit.pk).update(
+                adoptions_count=F("adoptions_count") + 1, version=F("version") + 1
+            )
+    except IntegrityError:
+        raise serializers.ValidationError("Привычка уже добавлена в Ваш список.")
+    return copy
+
+
+def refresh_popularity(batch_size=POPULARITY_BATCH_SIZE):
+    """
+    Переносит счетчики добавлений в рейтинг popularity пачками. Отставшие привычки
+    находятся по частичному индексу habit_popularity_stale_idx, поэтому работа
+    пропорциональна числу добавлений с прошлого запуска, а не размеру таблицы.
+    Если рейтинг изменился, кэш публичной ленты сбрасывается.
+    """
+    refreshed = 0
+    while True:
+        stale = (
+            Habit.objects.filter(adoptions_count__gt=F("popularity"))
+            .order_by("id")
+            .values("id")[:batch_size]
+        )
+        updated = Habit.objects.filter(id__in=stale).update(
+            popularity=F("adoptions_count")
+        )
+        if not updated:
+            break
+        refreshed += updated
+    if refreshed:
+        invalidate_public_feed()
+    return refreshed
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+from config.settings import PUBLIC_FEED_CACHE_TTL, PUBLIC_FEED_STALE_TTL
+
+PREFIX = "public_habits"
+GENERATION_KEY = f"{PREFIX}:generation"
+LOCK_TTL = 10
+WAIT_TIMEOUT = 2
+WAIT_STEP = 0.05
+STATS = ("hit", "miss", "stale", "wait")
+# Счетчики копятся в памяти процесса и переносятся в общий кэш не чаще раза в секунду
+STATS_FLUSH_INTERVAL = 1.0
+
+
+def get_generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate_public_feed():
+    """Сдвиг поколения делает недействительными все закэшированные страницы ленты."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+
+
+class StatsBuffer:
+    """
+    Счетчики обращений к кэшу ленты в памяти процесса. Попадание в кэш не тратит
+    обращений к Redis на статистику: накопленное переносится в общий кэш пачкой
+    не чаще STATS_FLUSH_INTERVAL и при чтении статистики.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.counts = Counter()
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, stat):
+        """Возвращает накопленные счетчики, если пора перенести их в общий кэш."""
+        with self.lock:
+            self.counts[stat] += 1
+            if time.monotonic() - self.flushed_at < self.interval:
+                return None
+            return self.take()
+
+    def take(self):
+        counts, self.counts = self.counts, Counter()
+        self.flushed_at = time.monotonic()
+        return counts
+
+    def take_all(self):
+        with self.lock:
+            return self.take()
+
+
+stats_buffer = StatsBuffer(STATS_FLUSH_INTERVAL)
+
+
+def get_stats_key(stat):
+    return f"{PREFIX}:stats:{stat}"
+
+
+def flush_stats(counts):
+    for stat, value in counts.items():
+        key = get_stats_key(stat)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            if not cache.add(key, value, None):
+                cache.incr(key, value)
+
+
+def count(stat):
+    counts = stats_buffer.add(stat)
+    if counts:
+        flush_stats(counts)
+
+
+def get_stats():
+    flush_stats(stats_buffer.take_all())
+    values = cache.get_many([get_stats_key(stat) for stat in STATS])
+    return {stat: values.get(get_stats_key(stat), 0) for stat in STATS}
+
+
+def get_page_key(request):
+    params = sorted(request.query_params.lists())
+    raw = f"{request.get_host()}?{params}".encode()
+    return hashlib.md5(raw).hexdigest()
+
+
+def get_page_keys(request, generation):
+    """
+    Ключи свежей копии, устаревшей копии и блокировки сборки страницы.
+    Устаревшая копия живет дольше свежей, но тоже привязана к поколению: после
+    снятия привычки с публикации старая страница не отдается.
+    """
+    page_key = get_page_key(request)
+    return (
+        f"{PREFIX}:{generation}:{page_key}",
+        f"{PREFIX}:stale:{generation}:{page_key}",
+        f"{PREFIX}:lock:{page_key}",
+    )
+
+
+def get_or_build_page(request, build):
+    """
+    Страница публичной ленты из кэша.
+    При промахе страницу пересобирает только один воркер, взявший блокировку;
+    остальные отдают устаревшую копию того же поколения, а если ее нет - ждут новую.
+    """
+    fresh_key, stale_key, lock_key = get_page_keys(request, get_generation())
+
+    data = cache.get(fresh_key)
+    if data is not None:
+        count("hit")
+        return data
+
+    acquired = cache.add(lock_key, 1, LOCK_TTL)
+    if not acquired:
+        data = cache.get(stale_key)
+        if data is not None:
+            count("stale")
+            return data
+
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            data = cache.get(fresh_key)
+            if data is not None:
+                count("wait")
+                return data
+
+    count("miss")
+    try:
+        data = build()
+        cache.set(fresh_key, data, PUBLIC_FEED_CACHE_TTL)
+        cache.set(stale_key, data, PUBLIC_FEED_STALE_TTL)
+    finally:
+        # Не дождавшись чужой сборки, запрос собирает страницу сам, но чужую
+        # блокировку не снимает: иначе следующая волна запросов тоже начнет сборку
+        if acquired:
+            cache.delete(lock_key)
+    return data
+
+
+async def acount(stat):
+    counts = stats_buffer.add(stat)
+    for stat, value in (counts or {}).items():
+        key = get_stats_key(stat)
+        try:
+            await cache.aincr(key, value)
+        except ValueError:
+            if not await cache.aadd(key, value, None):
+                await cache.aincr(key, value)
+
+
+async def aget_or_build_page(request, build):
+    """
+    Асинхронный вариант get_or_build_page для async view: build - корутина,
+    ожидание чужой сборки страницы не занимает поток.
+    """
+    generation = await cache.aget_or_set(GENERATION_KEY, 1, None)
+    fresh_key, stale_key, lock_key = get_page_keys(request, generation)
+
+    data = await cache.aget(fresh_key)
+    if data is not None:
+        await acount("hit")
+        return data
+
+    acquired = await cache.aadd(lock_key, 1, LOCK_TTL)
+    if not acquired:
+        data = await cache.aget(stale_key)
+        if data is not None:
+            await acount("stale")
+            return data
+
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_STEP)
+            data = await cache.aget(fresh_key)
+            if data is not None:
+                await acount("wait")
+                return data
+
+    await acount("miss")
+    try:
+        data = await build()
+        await cache.aset(fresh_key, data, PUBLIC_FEED_CACHE_TTL)
+        await cache.aset(stale_key, data, PUBLIC_FEED_STALE_TTL)
+    finally:
+        if acquired:
+            await cache.adelete(lock_key)
+    return data
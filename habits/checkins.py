@@ -0,0 +1,95 @@
+import json
+from datetime import date, datetime
+
+import redis
+from django.db import transaction
+
+from config.settings import CHECKIN_BATCH_SIZE, REDIS_URL
+from habits.models import Habit, HabitCompletion
+from habits.streaks import update_calendars
+
+BUFFER_KEY = "habits:checkins"
+
+_redis_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None and REDIS_URL:
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+def record_checkin(habit_id, day, completed_at):
+    """
+    Отметка выполнения попадает в список Redis и записывается в БД пачкой
+    задачей flush_checkins. Без Redis отметка сразу пишется в БД.
+    """
+    client = get_redis()
+    if client is None:
+        save_completions([(habit_id, day, completed_at)])
+        return
+    client.rpush(
+        BUFFER_KEY, json.dumps([habit_id, day.isoformat(), completed_at.isoformat()])
+    )
+
+
+def save_completions(checkins):
+    """
+    Вставка пачки отметок одним INSERT ... ON CONFLICT DO NOTHING
+    вместе с обновлением календарей выполнения.
+    Отметки удаленных за это время привычек отбрасываются.
+    """
+    unique = {}
+    for habit_id, day, completed_at in checkins:
+        unique.setdefault((habit_id, day), completed_at)
+    habit_ids = {habit_id for habit_id, _ in unique}
+    existing = set(Habit.objects.filter(id__in=habit_ids).values_list("id", flat=True))
+    completions = [
+        HabitCompletion(habit_id=habit_id, day=day, completed_at=completed_at)
+        for (habit_id, day), completed_at in unique.items()
+        if habit_id in existing
+    ]
+    with transaction.atomic():
+        HabitCompletion.objects.bulk_create(completions, ignore_conflicts=True)
+        update_calendars(
+            (completion.habit_id, completion.day) for completion in completions
+        )
+    return len(completions)
+
+
+def flush_checkins(batch_size=CHECKIN_BATCH_SIZE):
+    """
+    Переносит накопленные отметки из Redis в БД пачками по batch_size.
+    Пачка снимается со списка атомарно; если запись в БД не удалась, она возвращается.
+    """
+    client = get_redis()
+    if client is None:
+        return 0
+
+    flushed = 0
+    while True:
+        with client.pipeline() as pipe:
+            pipe.lrange(BUFFER_KEY, 0, batch_size - 1)
+            pipe.ltrim(BUFFER_KEY, batch_size, -1)
+            raw, _ = pipe.execute()
+        if not raw:
+            return flushed
+
+        checkins = []
+        for item in raw:
+            habit_id, day, completed_at = json.loads(item)
+            checkins.append(
+                (
+                    habit_id,
+                    date.fromisoformat(day),
+                    datetime.fromisoformat(completed_at),
+                )
+            )
+        try:
+            flushed += save_completions(checkins)
+        except Exception:
+            client.lpush(BUFFER_KEY, *reversed(raw))
+            raise
+        if len(raw) < batch_size:
+            return flushed
@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+from django.db.models import Count, Max, Sum
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = (
+        "Привычка была изменена, получите актуальную версию и повторите запрос."
+    )
+    default_code = "precondition_failed"
+
+
+def get_habit_etag(habit):
+    """Сильный ETag привычки по ее версии, без сериализации."""
+    return quote_etag(f"habit-{habit.pk}-v{habit.version}")
+
+
+STATE_AGGREGATES = {
+    "count": Count("id"),
+    "max_id": Max("id"),
+    "versions": Sum("version"),
+}
+
+
+def get_queryset_etag(queryset, request):
+    """
+    ETag списка по одной агрегации: число строк, максимальный id и сумма версий
+    меняются при любом создании, удалении или изменении привычки в выборке.
+    """
+    return get_state_etag(queryset.order_by().aggregate(**STATE_AGGREGATES), request)
+
+
+async def aget_queryset_etag(queryset, request):
+    state = await queryset.order_by().aaggregate(**STATE_AGGREGATES)
+    return get_state_etag(state, request)
+
+
+def get_state_etag(state, request):
+    params = sorted(request.query_params.lists())
+    raw = f"{params}:{state['count']}:{state['max_id']}:{state['versions']}"
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_data_etag(data):
+    """ETag по содержимому уже сериализованного ответа."""
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return "*" in etags or etag in etags
@@ -0,0 +1,73 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+from django.utils import timezone
+from openpyxl import Workbook
+
+# Excel и LibreOffice считают формулой ячейку, начинающуюся с одного из этих символов
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def escape_formula(value):
+    """Пользовательский текст не должен выполняться как формула: перед ним ставится '."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_csv(queryset, serializer, chunk_size):
+    """
+    CSV по кускам: строки читаются серверным курсором по chunk_size и сериализуются
+    через values(), поэтому в памяти одновременно только один кусок.
+    Значения совпадают с JSON списка привычек.
+    """
+    names = [field.field_name for field in serializer.get_readable_fields()]
+    rows = queryset.values(*serializer.get_values_fields())
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM нужен Excel, чтобы открыть кириллицу в UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(names)
+    for chunk in iter_chunks(rows.iterator(chunk_size=chunk_size), chunk_size):
+        writer.writerows(
+            [escape_formula(row[name]) for name in names]
+            for row in serializer.to_representation(chunk)
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def to_excel(value):
+    # Excel не хранит часовой пояс, время выгружается в локальном поясе
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return escape_formula(value)
+
+
+def build_xlsx(queryset, fields, chunk_size):
+    """
+    XLSX в режиме write-only: строки сразу уходят во временный файл на диске,
+    итоговый файл тоже на диске и отдается потоком.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Привычки")
+    sheet.append(fields)
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        sheet.append([to_excel(value) for value in row])
+
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return file
@@ -0,0 +1,82 @@
+from django.db.models import Q
+from django_filters import rest_framework as filters
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from habits.models import Habit
+from habits.search import search_habits
+
+
+class HabitSearchFilter(BaseFilterBackend):
+    """
+    Поиск привычек по ?search=: полнотекстовый по действию и месту с ранжированием
+    и по подстроке. Без параметра queryset не меняется.
+    """
+
+    search_param = "search"
+    max_length = 100
+
+    def get_search_text(self, request):
+        text = request.query_params.get(self.search_param, "")
+        return serializers.CharField(
+            max_length=self.max_length, allow_blank=True
+        ).run_validation(text)
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_text(request)
+        if not text:
+            return queryset
+        return search_habits(queryset, text)
+
+
+class HabitOrderingFilter(BaseFilterBackend):
+    """
+    Порядок ленты по ?ordering=: popular - по рейтингу популярности (индекс
+    habit_public_popular_idx), при поиске - совпадения по рейтингу. Без параметра
+    порядок не меняется.
+    """
+
+    ordering_param = "ordering"
+    orderings = {"popular": ("-popularity", "id")}
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_param)
+        if not ordering:
+            return queryset
+        ordering = serializers.ChoiceField(choices=list(self.orderings)).run_validation(
+            ordering
+        )
+        return queryset.order_by(*self.orderings[ordering])
+
+
+class HabitFilter(filters.FilterSet):
+    """
+    Фильтры списка личных привычек. Все поля фильтров включены в индекс
+    habit_owner_filter_idx, поэтому число строк и ETag любой комбинации фильтров
+    считаются по индексу без чтения таблицы.
+    """
+
+    date_deadline = filters.DateFromToRangeFilter(
+        label="Дата выполнения (date_deadline_after, date_deadline_before)"
+    )
+    time_deadline = filters.TimeRangeFilter(
+        method="filter_time_window",
+        label="Время выполнения (time_deadline_after, time_deadline_before)",
+    )
+
+    class Meta:
+        model = Habit
+        fields = ("is_active", "is_enjoyable", "is_public")
+
+    def filter_time_window(self, queryset, name, value):
+        """Окно времени включает границы; окно через полночь (22:00-02:00) - два интервала."""
+        start, stop = value.start, value.stop
+        if start is not None and stop is not None and start > stop:
+            return queryset.filter(
+                Q(**{f"{name}__gte": start}) | Q(**{f"{name}__lte": stop})
+            )
+        if start is not None:
+            queryset = queryset.filter(**{f"{name}__gte": start})
+        if stop is not None:
+            queryset = queryset.filter(**{f"{name}__lte": stop})
+        return queryset
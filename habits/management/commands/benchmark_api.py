@@ -0,0 +1,340 @@
+import json
+import math
+import os
+import time
+import uuid
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.settings import BASE_DIR
+from habits.models import Habit
+from habits.serializers import HabitSerializer
+from user.models import User
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет p50/p99 и число SQL-запросов всех эндпоинтов habits и user, "
+        "а также валидации HabitSerializer. Результаты сравниваются с JSON-базой; "
+        "при регрессии выше порога команда завершается с ошибкой. "
+        "Данные для замера создаются командой seed_habits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Замеров на каждый случай"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=5, help="Прогревочных прогонов без замера"
+        )
+        parser.add_argument(
+            "--baseline",
+            default=os.path.join(BASE_DIR, "benchmarks", "baseline.json"),
+            help="Файл с базовыми результатами",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Допустимый рост p50/p99 относительно базы (0.2 = 20%%)",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Записать текущие результаты как новую базу",
+        )
+        parser.add_argument("--output", help="Файл для сохранения текущих результатов")
+
+    def handle(self, *args, **options):
+        # Все, что создают и удаляют эндпоинты во время замера, откатывается
+        with transaction.atomic():
+            self.setup_data()
+            results = {
+                name: self.measure(prepare, run, options)
+                for name, prepare, run in self.get_cases()
+            }
+            transaction.set_rollback(True)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+                f"запросов {result['queries']}, статус {result['status']}"
+            )
+
+        if options["output"]:
+            self.save(options["output"], results)
+
+        baseline_path = options["baseline"]
+        if options["update_baseline"] or not os.path.exists(baseline_path):
+            self.save(baseline_path, results)
+            self.stdout.write(f"База сохранена в {baseline_path}")
+            return
+
+        with open(baseline_path, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = self.compare(baseline, results, options["threshold"])
+        if regressions:
+            raise CommandError(
+                "Регрессия производительности:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    def setup_data(self):
+        suffix = uuid.uuid4().hex[:8]
+        self.user = User.objects.create(
+            email=f"benchmark-{suffix}@example.com",
+            is_active=True,
+            is_staff=True,
+            chat_id=suffix,
+        )
+        self.enjoyable_habit = Habit.objects.create(
+            owner=self.user,
+            action="Послушать музыку",
+            location="Home",
+            time_deadline="09:00",
+            is_enjoyable=True,
+            time_to_complete=2,
+        )
+        self.habit = Habit.objects.create(
+            owner=self.user,
+            action="Сделать зарядку",
+            location="Home",
+            time_deadline="08:00",
+            is_enjoyable=False,
+            associated_habit=self.enjoyable_habit,
+            time_to_complete=2,
+            is_public=True,
+        )
+
+        self.client = APIClient(raise_request_exception=False)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        )
+        # Просмотр пользователя закрыт LoginRequiredMixin, ему нужна сессия
+        self.client.force_login(self.user)
+        self.anonymous_client = APIClient(raise_request_exception=False)
+
+    def get_habit_payload(self, **extra):
+        return {
+            "action": "Выпить стакан воды",
+            "location": "Office",
+            "time_deadline": "12:00",
+            "periodicity": 1,
+            "time_to_complete": 2,
+            "is_enjoyable": False,
+            "associated_habit": self.enjoyable_habit.pk,
+            **extra,
+        }
+
+    def create_habit(self, iteration):
+        return Habit.objects.create(
+            owner=self.user,
+            action="Удаляемая привычка",
+            location="Home",
+            time_deadline="10:00",
+            is_enjoyable=False,
+            reward="Прогулка",
+            time_to_complete=1,
+        )
+
+    def create_user(self, iteration):
+        return User.objects.create(email=f"delete-{uuid.uuid4().hex}@example.com")
+
+    def get_cases(self):
+        """Случаи замера: имя, подготовка вне замера и замеряемый вызов."""
+        client = self.client
+        habit_pk = self.habit.pk
+        user_pk = self.user.pk
+        no_prepare = lambda iteration: None  # noqa: E731
+
+        def validate_habit(_):
+            serializer = HabitSerializer(data=self.get_habit_payload())
+            serializer.is_valid(raise_exception=True)
+
+        return [
+            (
+                "GET habits:public_habits_list",
+                no_prepare,
+                lambda _: self.anonymous_client.get(
+                    reverse("habits:public_habits_list")
+                ),
+            ),
+            (
+                "GET habits:public_habits_list?search",
+                no_prepare,
+                lambda _: self.anonymous_client.get(
+                    reverse("habits:public_habits_list"), {"search": "зарядка"}
+                ),
+            ),
+            (
+                "GET habits:public_habits_cache_stats",
+                no_prepare,
+                lambda _: client.get(reverse("habits:public_habits_cache_stats")),
+            ),
+            (
+                "GET habits:habits_list",
+                no_prepare,
+                lambda _: client.get(reverse("habits:habits_list")),
+            ),
+            (
+                "GET habits:habits_export",
+                no_prepare,
+                lambda _: self.consume(
+                    client.get(reverse("habits:habits_export", args=["csv"]))
+                ),
+            ),
+            (
+                "POST habits:habit_create",
+                no_prepare,
+                lambda _: client.post(
+                    reverse("habits:habit_create"),
+                    self.get_habit_payload(),
+                    format="json",
+                ),
+            ),
+            (
+                "POST habits:habit_bulk",
+                no_prepare,
+                lambda _: client.post(
+                    reverse("habits:habit_bulk"),
+                    [self.get_habit_payload() for _ in range(10)],
+                    format="json",
+                ),
+            ),
+            (
+                "PATCH habits:habit_bulk",
+                no_prepare,
+                lambda _: client.patch(
+                    reverse("habits:habit_bulk"),
+                    [{"id": habit_pk, "location": "Park"}],
+                    format="json",
+                ),
+            ),
+            (
+                "PATCH habits:habit_update",
+                no_prepare,
+                lambda _: client.patch(
+                    reverse("habits:habit_update", args=[habit_pk]),
+                    {"location": "Park"},
+                    format="json",
+                ),
+            ),
+            (
+                "GET habits:habit_detail",
+                no_prepare,
+                lambda _: client.get(reverse("habits:habit_detail", args=[habit_pk])),
+            ),
+            (
+                "DELETE habits:habit_delete",
+                self.create_habit,
+                lambda habit: client.delete(
+                    reverse("habits:habit_delete", args=[habit.pk])
+                ),
+            ),
+            (
+                "POST habits:habit_checkin",
+                no_prepare,
+                lambda _: client.post(reverse("habits:habit_checkin", args=[habit_pk])),
+            ),
+            (
+                "GET habits:habit_stats",
+                no_prepare,
+                lambda _: client.get(reverse("habits:habit_stats", args=[habit_pk])),
+            ),
+            (
+                "GET user:user-list",
+                no_prepare,
+                lambda _: client.get(reverse("user:user-list")),
+            ),
+            (
+                "POST user:user-create",
+                lambda _: f"create-{uuid.uuid4().hex}@example.com",
+                lambda email: self.anonymous_client.post(
+                    reverse("user:user-create"),
+                    {"email": email, "password": "benchmark"},
+                    format="json",
+                ),
+            ),
+            (
+                "GET user:user-detail",
+                no_prepare,
+                lambda _: client.get(reverse("user:user-detail", args=[user_pk])),
+            ),
+            (
+                "PATCH user:user-update",
+                no_prepare,
+                lambda _: client.patch(
+                    reverse("user:user-update", args=[user_pk]),
+                    {"country": "Россия"},
+                    format="json",
+                ),
+            ),
+            (
+                "DELETE user:user-delete",
+                self.create_user,
+                lambda user: client.delete(reverse("user:user-delete", args=[user.pk])),
+            ),
+            ("HabitSerializer.is_valid", no_prepare, validate_habit),
+        ]
+
+    def consume(self, response):
+        """Потоковый ответ замеряется вместе с чтением всего содержимого."""
+        b"".join(response.streaming_content)
+        return response
+
+    def measure(self, prepare, run, options):
+        for iteration in range(options["warmup"]):
+            run(prepare(iteration))
+
+        timings, queries, status = [], 0, None
+        for iteration in range(options["iterations"]):
+            arg = prepare(iteration)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = run(arg)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(context.captured_queries))
+            status = getattr(response, "status_code", None)
+
+        return {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "queries": queries,
+            "status": status,
+        }
+
+    def compare(self, baseline, results, threshold):
+        regressions = []
+        for name, base in baseline.items():
+            result = results.get(name)
+            if result is None:
+                continue
+            if result["queries"] > base["queries"]:
+                regressions.append(
+                    f"{name}: запросов {base['queries']} -> {result['queries']}"
+                )
+            for metric in ("p50_ms", "p99_ms"):
+                if result[metric] > base[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{name}: {metric} {base[metric]:.2f} -> {result[metric]:.2f}"
+                    )
+        return regressions
+
+    def save(self, path, results):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,151 @@
+import json
+from datetime import timedelta
+
+from django.core.management import BaseCommand, call_command
+from django.db import connection, transaction
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.paginators import CustomPaginator
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет БД синтетическими привычками и сравнивает EXPLAIN ANALYZE "
+        "запросов горячих эндпоинтов без индексов привычек и с ними."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Сколько привычек добавить перед замером",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=10000,
+            help="Среди скольких пользователей распределить привычки",
+        )
+        parser.add_argument(
+            "--runs", type=int, default=5, help="Число прогонов каждого запроса"
+        )
+        parser.add_argument("--output", help="Файл для сохранения результатов в JSON")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self.seed(options["seed"], options["users"])
+
+        owner_id = (
+            Habit.objects.filter(owner__isnull=False)
+            .values_list("owner_id", flat=True)
+            .first()
+        )
+        queries = self.get_queries(owner_id)
+
+        # Замер "до" выполняется в транзакции, где схема индексов возвращена к исходной
+        # (одиночные индексы по owner_id и next_reminder_at), затем транзакция откатывается
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # DDL невозможен, пока в транзакции есть отложенные проверки внешних
+                # ключей (команда вызвана во внешней транзакции после --seed)
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                # Часть индексов создается условно (триграммный - только при pg_trgm)
+                for index in Habit._meta.indexes:
+                    cursor.execute(f'DROP INDEX IF EXISTS "{index.name}"')
+                cursor.execute("CREATE INDEX ON habits_habit (owner_id)")
+                cursor.execute("CREATE INDEX ON habits_habit (next_reminder_at)")
+            before = self.explain_all(queries, options["runs"])
+            transaction.set_rollback(True)
+
+        after = self.explain_all(queries, options["runs"])
+
+        report = {
+            name: {"before": before[name], "after": after[name]} for name in queries
+        }
+        for name, result in report.items():
+            self.stdout.write(
+                f"{name}: {result['before']['execution_ms']:.3f} ms "
+                f"({result['before']['plan']}) -> {result['after']['execution_ms']:.3f} ms "
+                f"({result['after']['plan']})"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def get_queries(self, owner_id):
+        page_size = CustomPaginator.page_size
+        bucket_end = timezone.now().replace(second=0, microsecond=0) + timedelta(
+            minutes=1
+        )
+        my_habits = Habit.objects.filter(owner_id=owner_id)
+        public_habits = Habit.objects.filter(is_public=True, is_active=True)
+        return {
+            "habits:habits_list": self.sql(my_habits.order_by("id")[:page_size]),
+            "habits:habits_list count": self.count_sql(my_habits),
+            "habits:public_habits_list": self.sql(
+                public_habits.order_by("id")[:page_size]
+            ),
+            "habits:public_habits_list count": self.count_sql(public_habits),
+            "dispatch_due_reminders": self.sql(
+                Habit.objects.filter(
+                    is_active=True, next_reminder_at__lt=bucket_end
+                ).values_list("id", "next_reminder_at", "periodicity", "owner__chat_id")
+            ),
+        }
+
+    def sql(self, queryset):
+        return queryset.query.sql_with_params()
+
+    def count_sql(self, queryset):
+        sql, params = queryset.values("id").query.sql_with_params()
+        return f"SELECT COUNT(*) FROM ({sql}) AS page", params
+
+    def explain_all(self, queries, runs):
+        return {
+            name: self.explain(sql, params, runs)
+            for name, (sql, params) in queries.items()
+        }
+
+    def explain(self, sql, params, runs):
+        timings = []
+        with connection.cursor() as cursor:
+            for _ in range(runs):
+                cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                timings.append(plan[0]["Execution Time"])
+        return {
+            "execution_ms": sorted(timings)[len(timings) // 2],
+            "plan": self.describe(plan[0]["Plan"]),
+        }
+
+    def describe(self, node):
+        """Краткое описание плана: типы узлов и использованные индексы."""
+        name = node["Node Type"]
+        if "Index Name" in node:
+            name = f"{name} using {node['Index Name']}"
+        children = [self.describe(child) for child in node.get("Plans", [])]
+        return f"{name} <- {', '.join(children)}" if children else name
+
+    def seed(self, habits_count, users_count):
+        """
+        Данные создаются через ORM командой seed_habits, поэтому заполняются все
+        обязательные поля, добавленные в схему позже.
+        """
+        users_count = min(users_count, habits_count)
+        self.stdout.write(
+            f"Создаю {users_count} пользователей и {habits_count} привычек..."
+        )
+        call_command(
+            "seed_habits",
+            users=users_count,
+            habits=-(-habits_count // users_count),
+            stdout=self.stdout,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE habits_habit")
+            cursor.execute("ANALYZE user_user")
@@ -0,0 +1,137 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from habits.management.commands.benchmark_api import percentile
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест запущенных серверов: на каждом уровне конкурентности "
+        "клиенты без пауз запрашивают пути по кругу, считаются RPS, p50/p99 и ошибки. "
+        "Запас по конкурентности - наибольший уровень, где p99 укладывается в --slo-ms "
+        "без ошибок. Так сравниваются WSGI и ASGI профили gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            action="append",
+            required=True,
+            help="Сервер в виде имя=URL, например asgi=http://127.0.0.1:8001 (можно несколько)",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Запрашиваемый путь (можно несколько), по умолчанию лента, с --user и личные привычки",
+        )
+        parser.add_argument(
+            "--concurrency",
+            default="1,10,50,100",
+            help="Уровни конкурентности через запятую",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Секунд на каждый уровень"
+        )
+        parser.add_argument(
+            "--user", help="Email пользователя, от имени которого идут запросы (JWT)"
+        )
+        parser.add_argument("--slo-ms", type=float, default=200, help="Допустимый p99")
+        parser.add_argument("--timeout", type=float, default=10)
+        parser.add_argument("--output", help="Файл для сохранения результатов в JSON")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url:
+                raise CommandError(f"Ожидается имя=URL: {target}")
+            targets.append((name, url.rstrip("/")))
+        levels = [int(level) for level in options["concurrency"].split(",")]
+
+        headers = {}
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Пользователь {options['user']} не найден")
+            headers["Authorization"] = (
+                f"Bearer {RefreshToken.for_user(user).access_token}"
+            )
+
+        paths = options["path"] or ["/habits/public/"]
+        if not options["path"] and headers:
+            paths.append("/habits/my/")
+
+        results = {}
+        for name, url in targets:
+            results[name] = []
+            for concurrency in levels:
+                level = self.run_level(url, paths, concurrency, headers, options)
+                results[name].append(level)
+                self.stdout.write(
+                    f"{name:<8} c={concurrency:<5} rps={level['rps']:<9} "
+                    f"p50={level['p50_ms']}ms p99={level['p99_ms']}ms "
+                    f"errors={level['errors']}"
+                )
+
+        for name, levels_results in results.items():
+            within_slo = [
+                level["concurrency"]
+                for level in levels_results
+                if level["errors"] == 0
+                and level["p99_ms"] is not None
+                and level["p99_ms"] <= options["slo_ms"]
+            ]
+            headroom = max(within_slo, default=0)
+            self.stdout.write(
+                f"{name}: запас по конкурентности {headroom} "
+                f"(p99 <= {options['slo_ms']}ms без ошибок)"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+                file.write("\n")
+
+    def run_level(self, url, paths, concurrency, headers, options):
+        deadline = time.monotonic() + options["duration"]
+
+        def client(index):
+            session = requests.Session()
+            session.headers.update(headers)
+            timings, errors = [], 0
+            while time.monotonic() < deadline:
+                path = paths[index % len(paths)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    response = session.get(url + path, timeout=options["timeout"])
+                    ok = response.status_code < 400
+                except requests.RequestException:
+                    ok = False
+                if ok:
+                    timings.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+            session.close()
+            return timings, errors
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            clients = list(pool.map(client, range(concurrency)))
+        elapsed = time.monotonic() - started
+
+        timings = [timing for client_timings, _ in clients for timing in client_timings]
+        return {
+            "concurrency": concurrency,
+            "requests": len(timings),
+            "errors": sum(errors for _, errors in clients),
+            "rps": round(len(timings) / elapsed, 1),
+            "p50_ms": round(percentile(timings, 50), 2) if timings else None,
+            "p99_ms": round(percentile(timings, 99), 2) if timings else None,
+        }
@@ -0,0 +1,122 @@
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from habits.models import Habit
+from user.models import User
+
+ACTIONS = (
+    "Сделать зарядку",
+    "Выпить стакан воды",
+    "Прочитать 10 страниц",
+    "Пройти 5000 шагов",
+    "Помедитировать",
+    "Позвонить маме",
+    "Убрать на столе",
+)
+ENJOYABLE_ACTIONS = ("Послушать музыку", "Выпить кофе", "Посмотреть сериал")
+LOCATIONS = ("Home", "Office", "Park", "Gym")
+REWARDS = ("Кусочек шоколада", "Серия сериала", "Прогулка")
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает N пользователей с M привычками у каждого: приятные, публичные, "
+        "со связанными привычками и вознаграждениями в реалистичных пропорциях."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=100, help="Число пользователей"
+        )
+        parser.add_argument(
+            "--habits",
+            type=int,
+            default=10,
+            help="Число привычек у каждого пользователя",
+        )
+        parser.add_argument(
+            "--password", default="benchmark", help="Пароль создаваемых пользователей"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Пользователей в одной пачке"
+        )
+        parser.add_argument("--random-seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["random_seed"])
+        password = make_password(options["password"])
+        run = uuid.uuid4().hex[:8]
+        users_left = options["users"]
+        created_users = created_habits = 0
+
+        while users_left > 0:
+            batch_size = min(users_left, options["batch_size"])
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    [
+                        User(
+                            email=f"seed-{run}-{created_users + i}@example.com",
+                            password=password,
+                            first_name=f"Пользователь {created_users + i}",
+                            is_active=True,
+                            chat_id=(
+                                f"{run}{created_users + i}"
+                                if rng.random() < 0.7
+                                else None
+                            ),
+                        )
+                        for i in range(batch_size)
+                    ]
+                )
+                created_habits += self.create_habits(users, options["habits"], rng)
+            created_users += batch_size
+            users_left -= batch_size
+
+        self.stdout.write(
+            f"Создано пользователей: {created_users}, привычек: {created_habits}"
+        )
+
+    def create_habits(self, users, habits_per_user, rng):
+        """Сначала приятные привычки (~30%), затем полезные со ссылкой на них или с наградой."""
+        enjoyable, useful = [], []
+        for user in users:
+            enjoyable_count = round(habits_per_user * 0.3)
+            for _ in range(enjoyable_count):
+                enjoyable.append(self.build_habit(user, rng, is_enjoyable=True))
+            for _ in range(habits_per_user - enjoyable_count):
+                useful.append(self.build_habit(user, rng, is_enjoyable=False))
+
+        enjoyable = Habit.objects.bulk_create(enjoyable)
+        enjoyable_by_owner = {}
+        for habit in enjoyable:
+            enjoyable_by_owner.setdefault(habit.owner_id, []).append(habit)
+
+        for habit in useful:
+            candidates = enjoyable_by_owner.get(habit.owner_id)
+            if candidates and rng.random() < 0.5:
+                habit.associated_habit = rng.choice(candidates)
+            elif rng.random() < 0.7:
+                habit.reward = rng.choice(REWARDS)
+        Habit.objects.bulk_create(useful)
+        return len(enjoyable) + len(useful)
+
+    def build_habit(self, user, rng, is_enjoyable):
+        habit = Habit(
+            owner=user,
+            action=rng.choice(ENJOYABLE_ACTIONS if is_enjoyable else ACTIONS),
+            location=rng.choice(LOCATIONS),
+            date_deadline=timezone.localdate(),
+            time_deadline=f"{rng.randint(6, 22):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+            is_enjoyable=is_enjoyable,
+            periodicity=rng.choice((1, 1, 1, 2, 3, 7)),
+            time_to_complete=rng.randint(1, 2),
+            is_public=rng.random() < 0.15,
+            is_active=rng.random() < 0.9,
+        )
+        habit.next_reminder_at = habit.get_next_reminder_at()
+        return habit
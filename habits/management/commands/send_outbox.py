@@ -0,0 +1,38 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from config.settings import OUTBOX_BATCH_SIZE
+from habits.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Процесс-отправитель уведомлений из outbox. Пачки захватываются "
+        "с SKIP LOCKED, поэтому можно запускать любое число таких процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза в секундах, когда отправлять нечего",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Разобрать outbox один раз и выйти"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_pending(batch_size=options["batch_size"])
+            if sent:
+                self.stdout.write(f"Отправлено уведомлений: {sent}")
+            if options["once"]:
+                return
+            if not sent:
+                time.sleep(options["interval"])
+            # Как и между запросами, закрываем устаревшие и сломанные соединения
+            close_old_connections()
@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand, CommandError
+
+from config.settings import TELEGRAM_WEBHOOK_SECRET
+from habits.services import get_telegram_client
+
+
+class Command(BaseCommand):
+    help = "Регистрация вебхука бота в Telegram с секретом TELEGRAM_WEBHOOK_SECRET"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url",
+            help="Публичный HTTPS-адрес, например https://<домен>/habits/telegram/webhook/",
+        )
+        parser.add_argument(
+            "--max-connections",
+            type=int,
+            default=40,
+            help="Сколько запросов Telegram отправляет на вебхук одновременно",
+        )
+
+    def handle(self, *args, **options):
+        if not TELEGRAM_WEBHOOK_SECRET:
+            raise CommandError("Не задан TELEGRAM_WEBHOOK_SECRET")
+
+        result = get_telegram_client().call(
+            "setWebhook",
+            {
+                "url": options["url"],
+                "secret_token": TELEGRAM_WEBHOOK_SECRET,
+                "allowed_updates": ["message", "callback_query"],
+                "max_connections": options["max_connections"],
+            },
+        )
+        if not result.get("ok"):
+            raise CommandError(result.get("description", "Telegram отклонил вебхук"))
+        self.stdout.write(f"Вебхук установлен: {options['url']}")
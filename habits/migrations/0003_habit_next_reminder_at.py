@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:16
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_next_reminder_at(apps, schema_editor):
+    Habit = apps.get_model("habits", "Habit")
+    now = timezone.now()
+    batch = []
+
+    for habit in Habit.objects.only(
+        "id", "date_deadline", "time_deadline", "periodicity"
+    ).iterator(chunk_size=2000):
+        start = timezone.make_aware(
+            datetime.combine(habit.date_deadline, habit.time_deadline)
+        )
+        if start < now:
+            period = timedelta(days=habit.periodicity or 1)
+            start += ((now - start) // period + 1) * period
+        habit.next_reminder_at = start
+        batch.append(habit)
+
+        if len(batch) == 2000:
+            Habit.objects.bulk_update(batch, ["next_reminder_at"])
+            batch = []
+
+    if batch:
+        Habit.objects.bulk_update(batch, ["next_reminder_at"])
+
+
+def delete_legacy_periodic_tasks(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(task="habits.tasks.send_reminder_with_bot").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0002_initial"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="next_reminder_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Момент следующей отправки напоминания, вычисляется автоматически",
+                null=True,
+                verbose_name="Следующее напоминание",
+            ),
+        ),
+        migrations.RunPython(fill_next_reminder_at, migrations.RunPython.noop),
+        migrations.RunPython(delete_legacy_periodic_tasks, migrations.RunPython.noop),
+    ]
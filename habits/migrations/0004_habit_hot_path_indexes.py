@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в большую таблицу
+    atomic = False
+
+    dependencies = [
+        ("habits", "0003_habit_next_reminder_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(fields=["owner", "id"], name="habit_owner_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_active", True), ("is_public", True)),
+                fields=["id"],
+                name="habit_public_active_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["next_reminder_at"],
+                name="habit_reminder_active_idx",
+            ),
+        ),
+        # Одиночный индекс по owner перекрыт habit_owner_id_idx. AlterField
+        # пересоздал бы внешний ключ с проверкой всей таблицы, поэтому в базе
+        # удаляется только сам индекс, без блокировки записи.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="habit",
+                    name="owner",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "habits_habit_owner_id_b09423d9";',
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS "habits_habit_owner_id_b09423d9" '
+                    'ON "habits_habit" ("owner_id");',
+                ),
+            ],
+        ),
+    ]
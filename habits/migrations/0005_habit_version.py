@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0004_habit_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Дата изменения"),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1,
+                help_text="Увеличивается при каждом изменении привычки, используется в ETag",
+                verbose_name="Версия",
+            ),
+        ),
+    ]
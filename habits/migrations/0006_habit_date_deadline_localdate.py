@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0005_habit_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="habit",
+            name="date_deadline",
+            field=models.DateField(
+                default=django.utils.timezone.localdate,
+                help_text="Дата, когда необходимо выполнять привычку",
+                verbose_name="Дата выполнения привычки",
+            ),
+        ),
+    ]
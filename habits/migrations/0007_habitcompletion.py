@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0006_habit_date_deadline_localdate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitCompletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateField(
+                        help_text="День, за который отмечено выполнение привычки",
+                        verbose_name="День выполнения",
+                    ),
+                ),
+                ("completed_at", models.DateTimeField(verbose_name="Момент отметки")),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="completions",
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выполнение привычки",
+                "verbose_name_plural": "Выполнения привычек",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "day"), name="habit_completion_habit_day_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_calendars(apps, schema_editor):
+    """Календари по уже записанным отметкам выполнения."""
+    HabitCompletion = apps.get_model("habits", "HabitCompletion")
+    HabitCalendar = apps.get_model("habits", "HabitCalendar")
+
+    calendars = {}
+    for habit_id, day in HabitCompletion.objects.values_list(
+        "habit_id", "day"
+    ).iterator():
+        bits = calendars.setdefault((habit_id, day.year), bytearray(46))
+        index = day.timetuple().tm_yday - 1
+        bits[index // 8] |= 1 << (index % 8)
+
+    HabitCalendar.objects.bulk_create(
+        [
+            HabitCalendar(habit_id=habit_id, year=year, bits=bytes(bits))
+            for (habit_id, year), bits in calendars.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0007_habitcompletion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitCalendar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="Год")),
+                (
+                    "bits",
+                    models.BinaryField(
+                        default=b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00",
+                        help_text="Бит N (младший бит первого байта - 1 января) установлен, если привычка выполнена в N-й день года",
+                        max_length=46,
+                        verbose_name="Календарь выполнения",
+                    ),
+                ),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="calendars",
+                        to="habits.habit",
+                        verbose_name="Привычка",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Календарь выполнения",
+                "verbose_name_plural": "Календари выполнения",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "year"), name="habit_calendar_habit_year_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_calendars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class TrigramExtensionIfAvailable(TrigramExtension):
+    """
+    pg_trgm входит в contrib (есть в образе postgres), но не во всех сборках;
+    без него поиск работает, подстрока ищется без индекса.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_available_extensions WHERE name = %s", [self.name]
+            )
+            if cursor.fetchone() is None:
+                return
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddTrigramIndexConcurrently(AddIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                return
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в большую таблицу
+    atomic = False
+
+    dependencies = [
+        ("habits", "0009_notificationoutbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtensionIfAvailable(),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    "action", "location", config="russian"
+                ),
+                condition=models.Q(("is_active", True), ("is_public", True)),
+                name="habit_public_search_idx",
+            ),
+        ),
+        AddTrigramIndexConcurrently(
+            model_name="habit",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("action"),
+                    name="gin_trgm_ops",
+                ),
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("location"),
+                    name="gin_trgm_ops",
+                ),
+                condition=models.Q(("is_active", True), ("is_public", True)),
+                name="habit_public_trgm_idx",
+            ),
+        ),
+    ]
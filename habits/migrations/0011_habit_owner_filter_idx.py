@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:40
+
+from django.conf import settings
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Новый индекс строится до удаления старого, чтобы список не остался без индекса
+    atomic = False
+
+    dependencies = [
+        ("habits", "0010_habit_search_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                fields=["owner", "id"],
+                include=(
+                    "is_active",
+                    "is_enjoyable",
+                    "is_public",
+                    "date_deadline",
+                    "time_deadline",
+                    "version",
+                ),
+                name="habit_owner_filter_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="habit",
+            name="habit_owner_id_idx",
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в большую таблицу
+    atomic = False
+
+    dependencies = [
+        ("habits", "0011_habit_owner_filter_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="adopted_from",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                help_text="Публичная привычка, которую пользователь добавил себе",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="adoptions",
+                to="habits.habit",
+                verbose_name="Исходная привычка",
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="adoptions_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Сколько раз привычку добавили себе другие пользователи",
+                verbose_name="Число добавлений",
+            ),
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="popularity",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Число добавлений на момент последнего пересчета рейтинга, обновляется фоновой задачей",
+                verbose_name="Популярность",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_active", True), ("is_public", True)),
+                fields=["-popularity", "id"],
+                name="habit_public_popular_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("adoptions_count__gt", models.F("popularity"))),
+                fields=["id"],
+                name="habit_popularity_stale_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="habit",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("adopted_from__isnull", False)),
+                fields=("adopted_from", "owner"),
+                name="habit_unique_adoption",
+            ),
+        ),
+    ]
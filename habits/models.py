@@ -1,13 +1,37 @@
+from datetime import datetime, timedelta
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 
+from habits.search import get_search_vector
 from user.models import User
 
 
+def next_occurrence(start, periodicity, after):
+    """
+    Ближайший момент не раньше after в ряду start, start + periodicity дней, ...
+    """
+    if start >= after:
+        return start
+    period = timedelta(days=periodicity or 1)
+    missed = (after - start) // period
+    occurrence = start + missed * period
+    if occurrence < after:
+        occurrence += period
+    return occurrence
+
+
 class Habit(models.Model):
 
     owner = models.ForeignKey(
-        User, on_delete=models.SET_NULL, verbose_name="Автор", null=True, blank=True
+        User,
+        on_delete=models.SET_NULL,
+        verbose_name="Автор",
+        null=True,
+        blank=True,
+        db_index=False,
     )
     location = models.CharField(
         max_length=30,
@@ -15,7 +39,7 @@ class Habit(models.Model):
         help_text="Место, в котором необходимо выполнять привычку",
     )
     date_deadline = models.DateField(
-        default=timezone.now,
+        default=timezone.localdate,
         verbose_name="Дата выполнения привычки",
         help_text="Дата, когда необходимо выполнять привычку",
     )
@@ -66,10 +90,262 @@ class Habit(models.Model):
         "привычки",
     )
     is_active = models.BooleanField(verbose_name="Признак активности", default=True)
+    next_reminder_at = models.DateTimeField(
+        verbose_name="Следующее напоминание",
+        help_text="Момент следующей отправки напоминания, вычисляется автоматически",
+        null=True,
+        blank=True,
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Версия",
+        help_text="Увеличивается при каждом изменении привычки, используется в ETag",
+    )
+    adopted_from = models.ForeignKey(
+        "Habit",
+        on_delete=models.SET_NULL,
+        related_name="adoptions",
+        verbose_name="Исходная привычка",
+        help_text="Публичная привычка, которую пользователь добавил себе",
+        null=True,
+        blank=True,
+        db_index=False,
+    )
+    adoptions_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число добавлений",
+        help_text="Сколько раз привычку добавили себе другие пользователи",
+    )
+    popularity = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Популярность",
+        help_text="Число добавлений на момент последнего пересчета рейтинга, "
+        "обновляется фоновой задачей",
+    )
 
     def __str__(self):
         return f"Я буду {self.action} в {self.time_deadline} в {self.location}."
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значение из БД нужно, чтобы заметить снятие привычки с публикации
+        instance._loaded_is_public = instance.__dict__.get("is_public", False)
+        return instance
+
+    def get_next_reminder_at(self, after=None):
+        """Ближайший момент напоминания с учетом даты, времени и периодичности привычки."""
+        date_deadline = self._meta.get_field("date_deadline").to_python(
+            self.date_deadline
+        )
+        time_deadline = self._meta.get_field("time_deadline").to_python(
+            self.time_deadline
+        )
+        start = timezone.make_aware(datetime.combine(date_deadline, time_deadline))
+        return next_occurrence(
+            start, int(self.periodicity or 1), after or timezone.now()
+        )
+
+    def save(self, *args, **kwargs):
+        # Версия растет в Python: HabitUpdateAPIView и пакетное изменение сохраняют
+        # привычку под блокировкой строки (SELECT ... FOR UPDATE)
+        if not self._state.adding:
+            self.version += 1
+        self.next_reminder_at = self.get_next_reminder_at()
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Привычка"
         verbose_name_plural = "Привычки"
+        indexes = [
+            # Список "мои привычки": фильтр по владельцу и сортировка по id. Поля
+            # фильтров HabitFilter и версия включены в индекс: число строк и ETag
+            # при любой комбинации фильтров считаются index-only scan
+            models.Index(
+                fields=["owner", "id"],
+                include=[
+                    "is_active",
+                    "is_enjoyable",
+                    "is_public",
+                    "date_deadline",
+                    "time_deadline",
+                    "version",
+                ],
+                name="habit_owner_filter_idx",
+            ),
+            # Публичная лента: только активные публичные привычки
+            models.Index(
+                fields=["id"],
+                name="habit_public_active_idx",
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            # Диспетчер напоминаний: диапазон по времени среди активных привычек
+            models.Index(
+                fields=["next_reminder_at"],
+                name="habit_reminder_active_idx",
+                condition=models.Q(is_active=True),
+            ),
+            # Лента с ?ordering=popular: рейтинг, пересчитываемый фоновой задачей
+            models.Index(
+                fields=["-popularity", "id"],
+                name="habit_public_popular_idx",
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            # Привычки, чей рейтинг отстал от счетчика добавлений, - работа для пересчета
+            models.Index(
+                fields=["id"],
+                name="habit_popularity_stale_idx",
+                condition=models.Q(adoptions_count__gt=models.F("popularity")),
+            ),
+            # Поиск в публичной ленте: полнотекстовый по действию и месту
+            GinIndex(
+                get_search_vector(),
+                name="habit_public_search_idx",
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            # Поиск по подстроке: icontains в Postgres - UPPER(...) LIKE, требует pg_trgm
+            GinIndex(
+                OpClass(Upper("action"), name="gin_trgm_ops"),
+                OpClass(Upper("location"), name="gin_trgm_ops"),
+                name="habit_public_trgm_idx",
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+        ]
+        constraints = [
+            # Пользователь добавляет себе привычку один раз; индекс служит и внешнему ключу
+            models.UniqueConstraint(
+                fields=["adopted_from", "owner"],
+                name="habit_unique_adoption",
+                condition=models.Q(adopted_from__isnull=False),
+            ),
+        ]
+
+
+class HabitCompletion(models.Model):
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="completions",
+        verbose_name="Привычка",
+        db_index=False,
+    )
+    day = models.DateField(
+        verbose_name="День выполнения",
+        help_text="День, за который отмечено выполнение привычки",
+    )
+    completed_at = models.DateTimeField(verbose_name="Момент отметки")
+
+    def __str__(self):
+        return f"{self.habit_id} выполнена {self.day}"
+
+    class Meta:
+        verbose_name = "Выполнение привычки"
+        verbose_name_plural = "Выполнения привычек"
+        constraints = [
+            # Повторные отметки за день отбрасываются при вставке (ON CONFLICT DO NOTHING),
+            # индекс ограничения заменяет индекс по habit_id
+            models.UniqueConstraint(
+                fields=["habit", "day"], name="habit_completion_habit_day_uniq"
+            ),
+        ]
+
+
+CALENDAR_BYTES = 46  # 366 дней по биту на день
+
+
+class HabitCalendar(models.Model):
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="calendars",
+        verbose_name="Привычка",
+        db_index=False,
+    )
+    year = models.PositiveSmallIntegerField(verbose_name="Год")
+    bits = models.BinaryField(
+        max_length=CALENDAR_BYTES,
+        default=bytes(CALENDAR_BYTES),
+        verbose_name="Календарь выполнения",
+        help_text="Бит N (младший бит первого байта - 1 января) установлен, если привычка выполнена в N-й день года",
+    )
+
+    def __str__(self):
+        return f"Календарь привычки {self.habit_id} за {self.year}"
+
+    class Meta:
+        verbose_name = "Календарь выполнения"
+        verbose_name_plural = "Календари выполнения"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "year"], name="habit_calendar_habit_year_uniq"
+            ),
+        ]
+
+
+class NotificationOutbox(models.Model):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Ожидает отправки"),
+        (SENT, "Отправлено"),
+        (FAILED, "Не доставлено"),
+    ]
+
+    habit = models.ForeignKey(
+        Habit,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        verbose_name="Привычка",
+        db_index=False,
+    )
+    scheduled_for = models.DateTimeField(
+        verbose_name="Момент напоминания",
+        help_text="Момент напоминания, за который создано уведомление",
+    )
+    chat_id = models.CharField(max_length=50, verbose_name="Чат Telegram")
+    text = models.TextField(verbose_name="Текст сообщения")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Число попыток отправки"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Доступно для отправки с",
+        help_text="Момент следующей попытки; при захвате сдвигается на время аренды",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата отправки")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+
+    def __str__(self):
+        return f"Уведомление {self.pk} для {self.chat_id}: {self.status}"
+
+    class Meta:
+        verbose_name = "Уведомление"
+        verbose_name_plural = "Очередь уведомлений"
+        constraints = [
+            # Повторный запуск диспетчера не создаст второе уведомление о том же напоминании
+            models.UniqueConstraint(
+                fields=["habit", "scheduled_for"],
+                name="outbox_habit_scheduled_uniq",
+            ),
+        ]
+        indexes = [
+            # Захват пачки: ожидающие уведомления, чья очередь подошла
+            models.Index(
+                fields=["available_at"],
+                name="outbox_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+            # Очистка старых отправленных и недоставленных уведомлений
+            models.Index(fields=["created_at"], name="outbox_created_idx"),
+        ]
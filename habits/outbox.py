@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from config.settings import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETENTION,
+    OUTBOX_RETRY_BASE,
+)
+from habits.models import NotificationOutbox
+from habits.services import build_checkin_keyboard, get_telegram_client
+
+# Ошибки Telegram, при которых повторная отправка бессмысленна:
+# чат не найден, бот заблокирован пользователем
+PERMANENT_ERROR_CODES = {400, 403}
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE, lease=OUTBOX_LEASE):
+    """
+    Захват пачки уведомлений. Строки выбираются с FOR UPDATE SKIP LOCKED, поэтому
+    параллельные отправители получают разные пачки; захват продлевает available_at
+    на время аренды, и если отправитель упадет, пачку после аренды заберет другой.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=NotificationOutbox.PENDING, available_at__lte=now)
+            .order_by("available_at")
+            .values_list("id", "chat_id", "text", "attempts", "habit_id")[:batch_size]
+        )
+        if batch:
+            NotificationOutbox.objects.filter(id__in=[row[0] for row in batch]).update(
+                available_at=now + lease, attempts=F("attempts") + 1
+            )
+    return batch
+
+
+def get_retry_delay(attempts):
+    """Экспоненциальная задержка: 1, 2, 4... базовых интервала."""
+    return OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+
+
+def send_batch(batch):
+    """
+    Отправка захваченной пачки в Telegram без обращений к БД: в воркере очереди
+    reminders (eventlet) работает только сеть. Возвращает ok, error_code и
+    description по каждому уведомлению.
+    """
+    results = get_telegram_client().send_many_concurrently(
+        (chat_id, text, {"reply_markup": build_checkin_keyboard(habit_id)})
+        for _, chat_id, text, _, habit_id in batch
+    )
+    return [
+        {key: result.get(key) for key in ("ok", "error_code", "description")}
+        for result in results
+    ]
+
+
+def record_results(batch, results):
+    """Фиксация результатов отправки пачки двумя запросами."""
+    now = timezone.now()
+    sent_ids, failed = [], []
+    for (outbox_id, _, _, attempts, _), result in zip(batch, results):
+        if result.get("ok"):
+            sent_ids.append(outbox_id)
+            continue
+        attempts += 1
+        permanent = result.get("error_code") in PERMANENT_ERROR_CODES
+        give_up = permanent or attempts >= OUTBOX_MAX_ATTEMPTS
+        failed.append(
+            NotificationOutbox(
+                id=outbox_id,
+                status=(
+                    NotificationOutbox.FAILED if give_up else NotificationOutbox.PENDING
+                ),
+                available_at=now + get_retry_delay(attempts),
+                last_error=str(result.get("description") or "")[:1000],
+            )
+        )
+
+    if sent_ids:
+        NotificationOutbox.objects.filter(id__in=sent_ids).update(
+            status=NotificationOutbox.SENT, sent_at=now, last_error=""
+        )
+    if failed:
+        NotificationOutbox.objects.bulk_update(
+            failed, ["status", "available_at", "last_error"]
+        )
+    return len(sent_ids), len(failed)
+
+
+def deliver_batch(batch):
+    """Отправка захваченной пачки и фиксация результата в одном процессе."""
+    return record_results(batch, send_batch(batch))
+
+
+def send_pending(batch_size=OUTBOX_BATCH_SIZE, max_batches=None):
+    """Отправка пачек, пока есть готовые уведомления. Возвращает число отправленных."""
+    sent = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = claim_batch(batch_size)
+        if not batch:
+            break
+        sent += deliver_batch(batch)[0]
+        batches += 1
+    return sent
+
+
+def purge(retention=OUTBOX_RETENTION, chunk_size=10000):
+    """Удаление отправленных и недоставленных уведомлений старше retention порциями."""
+    cutoff = timezone.now() - retention
+    finished = NotificationOutbox.objects.filter(
+        created_at__lt=cutoff,
+        status__in=[NotificationOutbox.SENT, NotificationOutbox.FAILED],
+    )
+    deleted = 0
+    while True:
+        ids = list(finished.values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += NotificationOutbox.objects.filter(id__in=ids).delete()[0]
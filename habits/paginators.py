@@ -1,7 +1,77 @@
-from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPaginator(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 10
+
+
+class HabitCursorPaginator(CursorPagination):
+    """
+    Keyset-пагинация по id: страница выбирается условием id > последнего,
+    без COUNT(*) и OFFSET, поэтому время ответа не зависит от глубины.
+    """
+
+    page_size = CustomPaginator.page_size
+    page_size_query_param = CustomPaginator.page_size_query_param
+    max_page_size = CustomPaginator.max_page_size
+    ordering = "id"
+
+
+class HabitPaginator(CustomPaginator):
+    """
+    Постраничная пагинация по ?page= для существующих клиентов.
+    Передав ?cursor= (пустой для первой страницы), клиент переключается
+    на keyset-пагинацию с непрозрачными ссылками next/previous.
+    """
+
+    cursor_query_param = HabitCursorPaginator.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = HabitCursorPaginator()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Асинхронный вариант для async view: число строк через acount(), строки
+        страницы через aiterator(). Keyset-страницу DRF собирает одним запросом
+        внутри paginate_queryset, поэтому она выполняется в потоке целиком.
+        """
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = HabitCursorPaginator()
+            return await sync_to_async(self.cursor_paginator.paginate_queryset)(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [row async for row in self.page.object_list.aiterator()]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
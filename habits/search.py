@@ -0,0 +1,31 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import Q
+
+# Конфигурация словаря должна совпадать с выражением индекса habit_public_search_idx
+SEARCH_CONFIG = "russian"
+# Подстроки короче трех символов не дают триграмм, и индекс pg_trgm для них не работает
+MIN_SUBSTRING_LENGTH = 3
+
+
+def get_search_vector():
+    return SearchVector("action", "location", config=SEARCH_CONFIG)
+
+
+def search_habits(queryset, text):
+    """
+    Полнотекстовый поиск по действию и месту с ранжированием по ts_rank.
+    Подстрока ищется через ILIKE, ее ускоряет триграммный индекс; такие совпадения
+    без совпадения по словам идут после ранжированных, внутри ранга - по id.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    condition = Q(search_vector=query)
+    if len(text) >= MIN_SUBSTRING_LENGTH:
+        condition |= Q(action__icontains=text) | Q(location__icontains=text)
+    return (
+        queryset.annotate(
+            search_vector=get_search_vector(),
+            rank=SearchRank(get_search_vector(), query),
+        )
+        .filter(condition)
+        .order_by("-rank", "id")
+    )
@@ -1,6 +1,11 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
-from habits.models import Habit
+from habits.cache import invalidate_public_feed
+from habits.models import Habit, HabitCompletion
 from habits.validators import (
     CheckHabitValidator,
     TimeToCompleteValidator,
@@ -9,10 +14,208 @@ from habits.validators import (
 )
 
 
+class HabitRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Связанная привычка по id. При пакетной обработке берется из словаря,
+    заранее загруженного одним запросом, вместо отдельного запроса на элемент.
+    """
+
+    def to_internal_value(self, data):
+        habits_by_id = self.context.get("habits_by_id")
+        if habits_by_id is None or self.queryset.model is not Habit:
+            return super().to_internal_value(data)
+        try:
+            return habits_by_id[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+def get_value_converter(field):
+    """
+    Функция, переводящая значение из values() в то же представление, что дает поле DRF.
+    None - значение из БД выводится как есть.
+    """
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if output_format is None:
+            return None
+        if output_format.lower() != ISO_8601:
+            return field.to_representation
+        field_timezone = (
+            field.timezone
+            if hasattr(field, "timezone")
+            else timezone.get_current_timezone() if settings.USE_TZ else None
+        )
+
+        def convert_datetime(value):
+            if field_timezone is not None:
+                value = value.astimezone(field_timezone)
+            value = value.isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert_datetime
+
+    for field_class, default_format, convert in (
+        (
+            serializers.DateField,
+            api_settings.DATE_FORMAT,
+            lambda value: value.isoformat(),
+        ),
+        (
+            serializers.TimeField,
+            api_settings.TIME_FORMAT,
+            lambda value: value.isoformat(),
+        ),
+    ):
+        if isinstance(field, field_class):
+            output_format = getattr(field, "format", default_format)
+            if output_format is None:
+                return None
+            if output_format.lower() != ISO_8601:
+                return field.to_representation
+            return convert
+
+    if isinstance(
+        field,
+        (
+            serializers.CharField,
+            serializers.IntegerField,
+            serializers.BooleanField,
+            serializers.ChoiceField,
+            serializers.PrimaryKeyRelatedField,
+        ),
+    ):
+        return None
+    return field.to_representation
+
+
+class ValuesListSerializerMixin:
+    """
+    Быстрый режим списка только для чтения: строки приходят из values() с полями
+    сериализатора и сразу собираются в словари без создания моделей
+    и вызова to_representation у каждого поля. JSON совпадает с обычным режимом.
+    """
+
+    def get_values_fields(self):
+        return [field.source for field in self.get_readable_fields()]
+
+    def get_readable_fields(self):
+        fields = [field for field in self.child.fields.values() if not field.write_only]
+        for field in fields:
+            if len(field.source_attrs) != 1:
+                raise TypeError(
+                    f"Поле {field.field_name} с источником {field.source} "
+                    f"не поддерживается в режиме values()"
+                )
+        return fields
+
+    def to_representation(self, data):
+        rows = data.all() if isinstance(data, models.manager.BaseManager) else data
+        rows = list(rows)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        plan = [
+            (field.field_name, field.source, get_value_converter(field))
+            for field in self.get_readable_fields()
+        ]
+        return [
+            {
+                name: (
+                    value
+                    if (value := row[source]) is None or convert is None
+                    else convert(value)
+                )
+                for name, source, convert in plan
+            }
+            for row in rows
+        ]
+
+
+class ValuesListSerializer(ValuesListSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class HabitBulkListSerializer(ValuesListSerializerMixin, serializers.ListSerializer):
+    """
+    Пакетное создание и изменение привычек: связанные привычки всей пачки
+    загружаются одним запросом, запись идет через bulk_create/bulk_update.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                if isinstance(item, dict) and item.get("associated_habit"):
+                    try:
+                        ids.add(int(item["associated_habit"]))
+                    except (TypeError, ValueError):
+                        pass
+            self._context["habits_by_id"] = Habit.objects.in_bulk(ids)
+            if self.instance is not None:
+                self.instances_by_id = {habit.pk: habit for habit in self.instance}
+                self.matched_instances = []
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        habit_id = data.get("id") if isinstance(data, dict) else None
+        instance = self.instances_by_id.get(habit_id)
+        if instance is None:
+            raise serializers.ValidationError({"id": "Привычка не найдена."})
+        if instance in self.matched_instances:
+            raise serializers.ValidationError({"id": "Привычка указана повторно."})
+        self.child.instance = instance
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        self.matched_instances.append(instance)
+        return validated
+
+    def create(self, validated_data):
+        habits = [Habit(**attrs) for attrs in validated_data]
+        for habit in habits:
+            habit.next_reminder_at = habit.get_next_reminder_at()
+
+        with transaction.atomic():
+            habits = Habit.objects.bulk_create(habits)
+            # Поколение ленты сдвигается после коммита, как в сигнале post_save
+            if any(habit.is_public for habit in habits):
+                transaction.on_commit(invalidate_public_feed)
+        return habits
+
+    def update(self, instances, validated_data):
+        fields = {"next_reminder_at", "version", "updated_at"}
+        was_public = any(habit.is_public for habit in self.matched_instances)
+        now = timezone.now()
+
+        for habit, attrs in zip(self.matched_instances, validated_data):
+            for field, value in attrs.items():
+                setattr(habit, field, value)
+            fields.update(attrs)
+            habit.version += 1
+            habit.updated_at = now
+            habit.next_reminder_at = habit.get_next_reminder_at()
+
+        with transaction.atomic():
+            Habit.objects.bulk_update(self.matched_instances, sorted(fields))
+            if was_public or any(habit.is_public for habit in self.matched_instances):
+                transaction.on_commit(invalidate_public_feed)
+        return self.matched_instances
+
+
 class HabitSerializer(serializers.ModelSerializer):
+    serializer_related_field = HabitRelatedField
+
     class Meta:
         model = Habit
-        fields = "__all__"
+        exclude = ("popularity",)
+        list_serializer_class = HabitBulkListSerializer
         validators = [
             CheckHabitValidator(
                 associated_habit="associated_habit",
@@ -23,10 +226,31 @@ class HabitSerializer(serializers.ModelSerializer):
             DateDeadlineValidator(date_deadline="date_deadline"),
             PeriodicityValidator(periodicity="periodicity"),
         ]
-        extra_kwargs = {"owner": {"read_only": True}}
+        extra_kwargs = {
+            "owner": {"read_only": True},
+            "next_reminder_at": {"read_only": True},
+            "version": {"read_only": True},
+            "adopted_from": {"read_only": True},
+            "adoptions_count": {"read_only": True},
+        }
 
 
 class PublicListHabitSerializer(serializers.ModelSerializer):
     class Meta:
         model = Habit
-        fields = ("id", "action", "periodicity", "time_to_complete", "is_public")
+        fields = (
+            "id",
+            "action",
+            "periodicity",
+            "time_to_complete",
+            "is_public",
+            "adoptions_count",
+        )
+        list_serializer_class = ValuesListSerializer
+
+
+class HabitCompletionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HabitCompletion
+        fields = ("habit", "day", "completed_at")
+        read_only_fields = fields
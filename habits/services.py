@@ -1,31 +1,248 @@
-import datetime
-import json
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+import redis
 import requests
-from django_celery_beat.models import IntervalSchedule, PeriodicTask
+from requests.adapters import HTTPAdapter
 
-from config.settings import TELEGRAM_URL, TELEGRAM_BOT_TOKEN
+from config.settings import (
+    REDIS_URL,
+    REMINDER_CONCURRENCY,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_MAX_RETRIES,
+    TELEGRAM_POOL_SIZE,
+    TELEGRAM_RATE_LIMIT,
+    TELEGRAM_TIMEOUT,
+    TELEGRAM_URL,
+)
+
+
+def running_on_eventlet():
+    """Код выполняется в воркере Celery с пулом eventlet (сокеты пропатчены)."""
+    eventlet = sys.modules.get("eventlet")
+    return eventlet is not None and eventlet.patcher.is_monkey_patched("socket")
+
+
+# Префикс callback_data кнопки отметки выполнения
+CHECKIN_CALLBACK = "checkin"
+
+
+class TelegramAPIError(Exception):
+    """Telegram не принял сообщение после всех повторных попыток."""
+
+
+class RedisTokenBucket:
+    """
+    Общий для всех воркеров token bucket в Redis.
+    Пополнение и списание токена выполняются атомарно Lua-скриптом,
+    пауза после ответа 429 хранится в отдельном ключе с TTL.
+    """
+
+    SCRIPT = """
+    local pause = redis.call('PTTL', KEYS[2])
+    if pause > 0 then
+        return pause
+    end
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = math.ceil((1 - tokens) * 1000 / rate)
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+    return wait
+    """
+
+    def __init__(self, client, rate, capacity=None, key="telegram:bucket"):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.key = key
+        self.pause_key = f"{key}:pause"
+        self.client = client
+        self.script = client.register_script(self.SCRIPT)
+
+    def acquire(self):
+        while True:
+            wait_ms = self.script(
+                keys=[self.key, self.pause_key], args=[self.rate, self.capacity]
+            )
+            if not wait_ms:
+                return
+            time.sleep(wait_ms / 1000)
+
+    def pause(self, seconds):
+        self.client.set(self.pause_key, 1, px=int(seconds * 1000))
+
+
+class LocalTokenBucket:
+    """Token bucket в памяти процесса, когда Redis не настроен."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.paused_until > now:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(
+                        self.capacity, self.tokens + (now - self.updated) * self.rate
+                    )
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class TelegramClient:
+    """
+    Клиент Bot API с постоянным пулом соединений и общим ограничением скорости.
+    Ответ 429 ставит на паузу всех отправителей на указанный Telegram retry_after.
+    """
+
+    def __init__(
+        self,
+        token,
+        base_url=TELEGRAM_URL,
+        rate_limiter=None,
+        timeout=TELEGRAM_TIMEOUT,
+        pool_size=TELEGRAM_POOL_SIZE,
+        max_retries=TELEGRAM_MAX_RETRIES,
+    ):
+        self.url = f"{base_url}{token}"
+        self.rate_limiter = rate_limiter or LocalTokenBucket(TELEGRAM_RATE_LIMIT)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        )
+
+    def call(self, method, payload):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self.session.post(
+                f"{self.url}/{method}", json=payload, timeout=self.timeout
+            )
+            result = response.json()
+            if response.status_code != 429:
+                return result
+            retry_after = result.get("parameters", {}).get("retry_after", 1)
+            self.rate_limiter.pause(retry_after)
+        raise TelegramAPIError(result.get("description", "Too Many Requests"))
+
+    def send_message(self, chat_id, text, **extra):
+        return self.call("sendMessage", {"chat_id": chat_id, "text": text, **extra})
+
+    def send_many(self, messages):
+        """
+        Отправка пачки сообщений (chat_id, text) или (chat_id, text, extra) с максимально
+        допустимой скоростью; extra - дополнительные параметры sendMessage.
+        Возвращает ответы Telegram в том же порядке, ошибки сети не прерывают пачку.
+        """
+        results = []
+        for chat_id, text, *extra in messages:
+            try:
+                results.append(
+                    self.send_message(chat_id, text, **(extra[0] if extra else {}))
+                )
+            except (requests.RequestException, ValueError, TelegramAPIError) as exc:
+                results.append({"ok": False, "description": str(exc)})
+        return results
+
+    def send_many_concurrently(self, messages, concurrency=REMINDER_CONCURRENCY):
+        """
+        Параллельная отправка пачки на event loop asyncio: одновременно в полете
+        не больше concurrency запросов, общий лимит скорости при этом сохраняется.
+        В воркере с пулом eventlet вместо asyncio и потоков используется GreenPool.
+        """
+        messages = list(messages)
+        if running_on_eventlet():
+            pool = sys.modules["eventlet"].GreenPool(concurrency)
+            return list(
+                pool.imap(lambda message: self.send_many([message])[0], messages)
+            )
+        return asyncio.run(self._send_many_async(messages, concurrency))
+
+    async def _send_many_async(self, messages, concurrency):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        async def send(message):
+            async with semaphore:
+                results = await loop.run_in_executor(
+                    executor, self.send_many, [message]
+                )
+                return results[0]
+
+        try:
+            return await asyncio.gather(*(send(message) for message in messages))
+        finally:
+            executor.shutdown(wait=False)
+
+
+_telegram_client = None
+
+
+def get_telegram_client():
+    """Клиент создается один раз на процесс воркера, уже после fork."""
+    global _telegram_client
+    if _telegram_client is None:
+        rate_limiter = None
+        if REDIS_URL:
+            rate_limiter = RedisTokenBucket(
+                redis.Redis.from_url(REDIS_URL), TELEGRAM_RATE_LIMIT
+            )
+        _telegram_client = TelegramClient(
+            TELEGRAM_BOT_TOKEN,
+            rate_limiter=rate_limiter,
+            pool_size=max(TELEGRAM_POOL_SIZE, REMINDER_CONCURRENCY),
+        )
+    return _telegram_client
 
 
 def send_telegram_message(message, chat_id):
-    params = {"text": message, "chat_id": chat_id}
-    response = requests.get(
-        f"{TELEGRAM_URL}{TELEGRAM_BOT_TOKEN}/sendMessage", params=params
-    )
+    return get_telegram_client().send_message(chat_id, message)
 
 
-def set_schedule_every_day(habit_id, periodicity):
+def build_checkin_keyboard(habit_id):
+    """Кнопка под напоминанием, нажатие приходит в вебхук как callback_query."""
+    return {
+        "inline_keyboard": [
+            [{"text": "Выполнено", "callback_data": f"{CHECKIN_CALLBACK}:{habit_id}"}]
+        ]
+    }
 
-    schedule, created = IntervalSchedule.objects.get_or_create(
-        periodicity=periodicity,
-        period=IntervalSchedule.DAYS,
-    )
 
-    PeriodicTask.objects.create(
-        interval=schedule,
-        name="Habit Reminder Bot",
-        task="habits.tasks.send_reminder_with_bot",
-        args=json.dumps([habit_id]),
-        kwargs=json.dumps({}),
-        expires=datetime.utcnow() + datetime.timedelta(days=1),
+def build_reminder_message(habit):
+    """Текст напоминания о привычке."""
+    return (
+        f"Напоминание: Сегодня я буду {habit.action} в {habit.time_deadline} "
+        f"в {habit.location}."
     )
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from habits.cache import invalidate_public_feed
+from habits.models import Habit
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def invalidate_public_feed_cache(sender, instance, **kwargs):
+    """
+    Сброс кэша публичной ленты, если изменилась публичная (или бывшая публичной) привычка.
+    Поколение сдвигается после коммита: иначе параллельный запрос успел бы собрать
+    страницу из старых данных и сохранить ее под новым поколением.
+    """
+    if instance.__dict__.get("is_public") or getattr(
+        instance, "_loaded_is_public", False
+    ):
+        transaction.on_commit(invalidate_public_feed)
+
+
+@receiver(pre_delete, sender=Habit)
+def bump_adopted_copies_version(sender, instance, **kwargs):
+    """
+    Удаление исходной привычки обнуляет adopted_from у копий UPDATE-ом без save():
+    версия копий увеличивается, чтобы у их владельцев сменился ETag списка.
+    """
+    Habit.objects.filter(adopted_from=instance).update(version=F("version") + 1)
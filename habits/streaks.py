@@ -0,0 +1,114 @@
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+from django.db import transaction
+
+from habits.models import CALENDAR_BYTES, HabitCalendar
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def unpack_days(raw, year):
+    """Календарь года в массив 0/1 по дням, индекс 0 - 1 января."""
+    raw = bytes(raw) if raw is not None else bytes(CALENDAR_BYTES)
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")
+    return bits[: (date(year, 12, 31) - date(year, 1, 1)).days + 1]
+
+
+def pack_days(days):
+    bits = np.zeros(CALENDAR_BYTES * 8, dtype=np.uint8)
+    bits[: len(days)] = days
+    return np.packbits(bits, bitorder="little").tobytes()
+
+
+def update_calendars(completions):
+    """
+    Отмечает дни выполнения в календарях привычек. Запросов три на всю пачку:
+    создание недостающих календарей, блокировка нужных и bulk_update.
+    """
+    days_by_key = defaultdict(list)
+    for habit_id, day in completions:
+        days_by_key[(habit_id, day.year)].append(day.timetuple().tm_yday - 1)
+    if not days_by_key:
+        return
+
+    with transaction.atomic():
+        HabitCalendar.objects.bulk_create(
+            [
+                HabitCalendar(habit_id=habit_id, year=year)
+                for habit_id, year in days_by_key
+            ],
+            ignore_conflicts=True,
+        )
+        calendars = (
+            HabitCalendar.objects.select_for_update()
+            .filter(
+                habit_id__in={habit_id for habit_id, _ in days_by_key},
+                year__in={year for _, year in days_by_key},
+            )
+            .order_by("habit_id", "year")
+        )
+        changed = []
+        for calendar in calendars:
+            indexes = days_by_key.get((calendar.habit_id, calendar.year))
+            if indexes is None:
+                continue
+            days = unpack_days(calendar.bits, calendar.year)
+            days[indexes] = 1
+            calendar.bits = pack_days(days)
+            changed.append(calendar)
+        HabitCalendar.objects.bulk_update(changed, ["bits"])
+
+
+def longest_run(flags):
+    """Длина самой длинной серии True."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
+
+
+def get_habit_stats(habit, calendars, year, today):
+    """
+    Статистика привычки за год по календарям {год: биты} за этот и предыдущий год.
+    Серии считаются в периодах привычки: период выполнен, если в нем есть отметка.
+    Периоды отсчитываются от date_deadline, как и напоминания; незавершенный текущий
+    период не прерывает серию.
+    """
+    period = int(habit.periodicity or 1)
+    window_start = date(year - 1, 1, 1)
+    end = min(today, date(year, 12, 31))
+    year_days = unpack_days(calendars.get(year), year)
+
+    previous_days = unpack_days(calendars.get(year - 1), year - 1)
+    days = np.concatenate([previous_days, year_days])[: (end - window_start).days + 1]
+    offsets = np.arange(len(days)) + (window_start - habit.date_deadline).days
+    period_index = np.floor_divide(offsets, period)
+    period_index -= period_index[0]
+
+    done = np.zeros(period_index[-1] + 1, dtype=bool)
+    done[period_index[days.astype(bool)]] = True
+    finished = done if done[-1] else done[:-1]
+
+    misses = np.flatnonzero(~finished)
+    current_streak = len(finished) - 1 - misses[-1] if len(misses) else len(finished)
+
+    first_day = max(date(year, 1, 1), habit.date_deadline)
+    completion_rate = None
+    if first_day <= end:
+        first_period = period_index[(first_day - window_start).days]
+        expected = finished[first_period:]
+        if len(expected):
+            completion_rate = round(float(expected.mean()), 4)
+
+    completed = np.flatnonzero(year_days[: (end - date(year, 1, 1)).days + 1])
+    weekdays = np.bincount((completed + date(year, 1, 1).weekday()) % 7, minlength=7)
+    return {
+        "habit": habit.pk,
+        "year": year,
+        "periodicity": period,
+        "completed_days": int(year_days.sum()),
+        "current_streak": int(current_streak),
+        "longest_streak": longest_run(finished),
+        "completion_rate": completion_rate,
+        "weekdays": dict(zip(WEEKDAYS, weekdays.tolist())),
+    }
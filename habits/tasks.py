@@ -1,20 +1,212 @@
-from datetime import timezone
+from datetime import date, datetime, timedelta
+from functools import partial
 
-from celery import shared_task
+from celery import chain, shared_task
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
-
-from habits.models import Habit
-from habits.services import send_telegram_message
+from config.settings import OUTBOX_BATCH_SIZE, REMINDER_BATCH_SIZE, REMINDER_MAX_DELAY
+from habits import adoptions, checkins, outbox
+from habits.models import Habit, NotificationOutbox, next_occurrence
+from habits.services import (
+    build_reminder_message,
+    get_telegram_client,
+    send_telegram_message,
+)
+from user.authentication import invalidate_cached_user
+from user.models import User
 
 
 @shared_task
-def send_reminder_with_bot(habit_id, messagge):
+def send_reminder_with_bot(habit_id):
     """Отправка напоминания о привычке с помощью телеграм-бота."""
-    today = timezone.now().today()
-    habit = Habit.objects.filter(id=habit_id, time_deadline=today)
+    habit = Habit.objects.select_related("owner").filter(id=habit_id).first()
+
+    if habit and habit.owner and habit.owner.chat_id:
+        send_telegram_message(build_reminder_message(habit), habit.owner.chat_id)
+
+
+@shared_task
+def send_reminders_batch(habit_ids):
+    """
+    Отправка напоминаний по пачке привычек: привычки и chat_id владельцев
+    загружаются одним запросом, сообщения уходят параллельно на event loop.
+    """
+    queryset = (
+        Habit.objects.select_related("owner")
+        .only("action", "time_deadline", "location", "owner__chat_id")
+        .filter(id__in=habit_ids)
+    )
+    habits = [habit for habit in queryset if habit.owner and habit.owner.chat_id]
+
+    results = get_telegram_client().send_many_concurrently(
+        (habit.owner.chat_id, build_reminder_message(habit)) for habit in habits
+    )
+    return {habit.id: result.get("ok", False) for habit, result in zip(habits, results)}
+
+
+@shared_task
+def dispatch_due_reminders():
+    """
+    Раз в минуту выбирает привычки, время напоминания которых наступило,
+    записывает уведомления в outbox и сдвигает момент следующего напоминания
+    в одной транзакции, после фиксации которой запускаются отправители.
+    Строки блокируются с SKIP LOCKED, поэтому параллельный запуск не задублирует рассылку.
+    """
+    now = timezone.now()
+    bucket_end = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    oldest_allowed = now - REMINDER_MAX_DELAY
+
+    with transaction.atomic():
+        due = (
+            Habit.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(is_active=True, next_reminder_at__lt=bucket_end)
+            .values_list(
+                "id",
+                "next_reminder_at",
+                "periodicity",
+                "action",
+                "time_deadline",
+                "location",
+                "owner__chat_id",
+            )
+        )
+
+        notifications, advanced = [], []
+        for (
+            habit_id,
+            next_reminder_at,
+            periodicity,
+            action,
+            time_deadline,
+            location,
+            chat_id,
+        ) in due.iterator(chunk_size=REMINDER_BATCH_SIZE):
+            advanced.append(
+                Habit(
+                    id=habit_id,
+                    next_reminder_at=next_occurrence(
+                        next_reminder_at, periodicity, bucket_end
+                    ),
+                    version=F("version") + 1,
+                )
+            )
+            if chat_id and next_reminder_at >= oldest_allowed:
+                habit = Habit(
+                    action=action, time_deadline=time_deadline, location=location
+                )
+                notifications.append(
+                    NotificationOutbox(
+                        habit_id=habit_id,
+                        scheduled_for=next_reminder_at,
+                        chat_id=chat_id,
+                        text=build_reminder_message(habit),
+                        available_at=now,
+                    )
+                )
+
+            if len(notifications) == REMINDER_BATCH_SIZE:
+                _write_outbox(notifications)
+                notifications = []
+            if len(advanced) == REMINDER_BATCH_SIZE:
+                Habit.objects.bulk_update(advanced, ["next_reminder_at", "version"])
+                advanced = []
+
+        if notifications:
+            _write_outbox(notifications)
+        if advanced:
+            Habit.objects.bulk_update(advanced, ["next_reminder_at", "version"])
+
+
+def _write_outbox(notifications):
+    NotificationOutbox.objects.bulk_create(notifications, ignore_conflicts=True)
+    # Отправитель на каждую записанную пачку: они разбирают outbox параллельно
+    transaction.on_commit(send_outbox.delay)
+
+
+@shared_task(ignore_result=True)
+def send_outbox():
+    """
+    Отправка уведомлений из outbox. Пачка захватывается с SKIP LOCKED здесь, в очереди
+    default (prefork), отправляется задачей send_outbox_batch в очереди reminders
+    (eventlet, только сеть), а результаты записывает record_outbox_batch снова в
+    default. Полная пачка запускает следующий захват, поэтому у каждого отправителя
+    в полете одна пачка и аренда не истекает в очереди.
+    """
+    batch = outbox.claim_batch()
+    if batch:
+        chain(send_outbox_batch.s(batch), record_outbox_batch.s(batch)).delay()
+    return len(batch)
+
+
+@shared_task(ignore_result=True)
+def send_outbox_batch(batch):
+    """Отправка захваченной пачки в Telegram без обращений к БД."""
+    return outbox.send_batch(batch)
+
+
+@shared_task(ignore_result=True)
+def record_outbox_batch(results, batch):
+    """Запись результатов отправки пачки и захват следующей, если пачка была полной."""
+    outbox.record_results(batch, results)
+    if len(batch) >= OUTBOX_BATCH_SIZE:
+        send_outbox.delay()
+
+
+@shared_task(ignore_result=True)
+def purge_outbox():
+    """Удаление старых отправленных и недоставленных уведомлений."""
+    return outbox.purge()
+
+
+@shared_task(ignore_result=True)
+def flush_checkins():
+    """Перенос отметок выполнения из буфера Redis в БД пачками."""
+    return checkins.flush_checkins()
+
+
+@shared_task(ignore_result=True)
+def refresh_popularity():
+    """Пересчет рейтинга популярности публичных привычек по счетчикам добавлений."""
+    return adoptions.refresh_popularity()
+
+
+@shared_task(ignore_result=True)
+def link_telegram_chat(token, chat_id):
+    """
+    Привязка чата телеграма к пользователю по токену из команды /start.
+    Токен одноразовый; чат, привязанный к другому аккаунту, переходит к новому.
+    """
+    with transaction.atomic():
+        user = User.objects.select_for_update().filter(token=token).first()
+        if user is not None:
+            changed = [user.pk]
+            changed += (
+                User.objects.filter(chat_id=chat_id)
+                .exclude(pk=user.pk)
+                .values_list("pk", flat=True)
+            )
+            User.objects.filter(pk__in=changed[1:]).update(chat_id=None)
+            User.objects.filter(pk=user.pk).update(chat_id=chat_id, token=None)
+            # update() не вызывает post_save, кэш аутентификации сбрасывается явно
+            for user_id in changed:
+                transaction.on_commit(partial(invalidate_cached_user, user_id))
+
+    send_telegram_message(
+        (
+            "Телеграм привязан, напоминания о привычках будут приходить сюда."
+            if user is not None
+            else "Ссылка для привязки недействительна или уже использована."
+        ),
+        chat_id,
+    )
+
 
-    if habit.owner.chat_id:
-        send_telegram_message(
-            "Напоминание: Сегодня я буду {self.action} в {self.time_deadline} в {self.location}.",
-            habit.owner.chat_id,
+@shared_task(ignore_result=True)
+def checkin_from_telegram(habit_id, chat_id, day, completed_at):
+    """Отметка выполнения по кнопке в телеграме, только для привычек владельца чата."""
+    if Habit.objects.filter(id=habit_id, owner__chat_id=chat_id).exists():
+        checkins.record_checkin(
+            habit_id, date.fromisoformat(day), datetime.fromisoformat(completed_at)
         )
@@ -1,9 +1,73 @@
+import csv
+import io
+import ipaddress
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from datetime import time as dt_time
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import requests
+from asgiref.sync import async_to_sync
+from openpyxl import load_workbook
+from prometheus_client import REGISTRY
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import LiveServerTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
-
-from habits.models import Habit
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import (
+    APITestCase,
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.celery import app as celery_app
+from config.metrics import collect_pool_stats, metrics
+from habits.adoptions import refresh_popularity
+from habits.cache import (
+    get_generation,
+    get_page_key,
+    get_stats,
+    invalidate_public_feed,
+    stats_buffer,
+)
+from habits.checkins import save_completions
+from habits.models import Habit, HabitCalendar, HabitCompletion, NotificationOutbox
+from habits.outbox import claim_batch, deliver_batch, purge, send_pending
 from habits.paginators import CustomPaginator
+from habits.serializers import HabitSerializer, PublicListHabitSerializer
+from habits.views import (
+    AsyncHabitListAPIView,
+    AsyncHabitRetrieveAPIView,
+    AsyncPublicHabitListAPIView,
+    HabitListAPIView,
+    HabitRetrieveAPIView,
+    PublicHabitListAPIView,
+)
+from habits.services import LocalTokenBucket, TelegramClient
+from habits.streaks import get_habit_stats, pack_days
+from habits.tasks import (
+    checkin_from_telegram,
+    dispatch_due_reminders,
+    link_telegram_chat,
+    record_outbox_batch,
+    send_outbox,
+    send_outbox_batch,
+    send_reminder_with_bot,
+    send_reminders_batch,
+)
 from user.models import User
 
 
@@ -787,8 +851,104 @@ class HabitListAPIViewTest(APITestCase):
         # self.assertIsNotNone(response_page1.data['next']) # Должна быть следующая страница
 
 
+class HabitFilterTestCase(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create(email="filter@example.com")
+        self.other_user = User.objects.create(email="filter-other@example.com")
+        self.habits = {
+            name: Habit.objects.create(
+                owner=owner,
+                action=name,
+                location="Home",
+                date_deadline=date_deadline,
+                time_deadline=time_deadline,
+                periodicity=1,
+                is_enjoyable=is_enjoyable,
+                is_public=is_public,
+                is_active=is_active,
+            )
+            for name, owner, date_deadline, time_deadline, is_enjoyable, is_public, is_active in (
+                ("morning", self.owner, "2025-09-01", "07:00", False, True, True),
+                ("evening", self.owner, "2025-09-10", "23:00", True, False, True),
+                ("night", self.owner, "2025-09-20", "01:30", False, False, False),
+                ("other", self.other_user, "2025-09-01", "07:00", False, True, True),
+            )
+        }
+        self.url = reverse("habits:habits_list")
+        self.client.force_authenticate(user=self.owner)
+
+    def filter(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {habit["action"] for habit in response.data["results"]}
+
+    def test_boolean_filters(self):
+        self.assertEqual(self.filter(is_active="false"), {"night"})
+        self.assertEqual(self.filter(is_enjoyable="true"), {"evening"})
+        self.assertEqual(self.filter(is_public="true"), {"morning"})
+        self.assertEqual(
+            self.filter(is_active="true", is_enjoyable="false"), {"morning"}
+        )
+
+    def test_date_range(self):
+        self.assertEqual(
+            self.filter(
+                date_deadline_after="2025-09-05", date_deadline_before="2025-09-20"
+            ),
+            {"evening", "night"},
+        )
+        self.assertEqual(self.filter(date_deadline_before="2025-09-01"), {"morning"})
+
+    def test_time_window(self):
+        self.assertEqual(
+            self.filter(time_deadline_after="06:00", time_deadline_before="08:00"),
+            {"morning"},
+        )
+        # Окно через полночь
+        self.assertEqual(
+            self.filter(time_deadline_after="22:00", time_deadline_before="02:00"),
+            {"evening", "night"},
+        )
+        self.assertEqual(self.filter(time_deadline_after="20:00"), {"evening"})
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.url, {"date_deadline_after": "завтра"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag_depends_on_filters(self):
+        all_habits = self.client.get(self.url)
+        active = self.client.get(self.url, {"is_active": "true"})
+        self.assertNotEqual(all_habits["ETag"], active["ETag"])
+
+        response = self.client.get(
+            self.url, {"is_active": "true"}, HTTP_IF_NONE_MATCH=active["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_count_uses_index_only_scan(self):
+        """Число строк при любых фильтрах считается по покрывающему индексу."""
+        params = {
+            "is_active": "true",
+            "is_public": "false",
+            "date_deadline_after": "2025-09-01",
+            "time_deadline_after": "22:00",
+            "time_deadline_before": "02:00",
+        }
+        view = HabitListAPIView()
+        view.request = Request(APIRequestFactory().get("/", params))
+        view.request.user = self.owner
+        view.format_kwarg = None
+        queryset = view.filter_queryset(view.get_queryset())
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        plan = queryset.order_by().values("pk").explain()
+        self.assertIn("Index Only Scan using habit_owner_filter_idx", plan)
+
+
 class PublicHabitListAPIViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         # Создаем пользователей
         self.owner_user = User.objects.create(
             email="owner@example.com", password="123qwe"
@@ -993,6 +1153,45 @@ class PublicHabitListAPIViewTest(APITestCase):
         ):
             self.assertTrue(habit_data["is_public"])
 
+    def test_cursor_pagination_walks_all_pages(self):
+        """
+        С ?cursor= список отдается keyset-пагинацией: без count, по возрастанию id.
+        """
+        with self.assertNumQueries(1):
+            response_page1 = self.unauthenticated_client.get(self.url, {"cursor": ""})
+        self.assertEqual(response_page1.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response_page1.data)
+        self.assertIsNone(response_page1.data["previous"])
+
+        response_page2 = self.unauthenticated_client.get(response_page1.data["next"])
+        self.assertEqual(response_page2.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response_page2.data["next"])
+
+        retrieved_ids = [
+            habit["id"]
+            for habit in response_page1.data["results"] + response_page2.data["results"]
+        ]
+        expected_ids = list(
+            Habit.objects.filter(is_public=True)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(retrieved_ids, expected_ids)
+
+    def test_inactive_public_habits_are_hidden(self):
+        """
+        Неактивные публичные привычки не попадают в общий список.
+        """
+        self.public_habit_1.is_active = False
+        self.public_habit_1.save()
+
+        response = self.unauthenticated_client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], self.total_public_habits_count - 1)
+        retrieved_ids = {habit["id"] for habit in response.data["results"]}
+        self.assertNotIn(self.public_habit_1.pk, retrieved_ids)
+
     def test_empty_list_if_no_public_habits(self):
         """
         Если публичных привычек нет, должен быть возвращен пустой список.
@@ -1005,3 +1204,1700 @@ class PublicHabitListAPIViewTest(APITestCase):
         self.assertEqual(len(response.data["results"]), 0)
         self.assertIsNone(response.data["next"])
         self.assertIsNone(response.data["previous"])
+
+
+class ReminderDispatchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="chat@example.com", chat_id="100500")
+        self.user_without_chat = User.objects.create(email="nochat@example.com")
+
+        self.habit = Habit.objects.create(
+            owner=self.user,
+            action="Выпить воды",
+            time_deadline="09:00",
+            periodicity=2,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=False,
+        )
+        self.habit_without_chat = Habit.objects.create(
+            owner=self.user_without_chat,
+            action="Сделать зарядку",
+            time_deadline="09:00",
+            periodicity=1,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=False,
+        )
+        self.now = timezone.now()
+        Habit.objects.update(next_reminder_at=self.now - timedelta(seconds=30))
+
+    def test_next_reminder_at_is_calculated_on_save(self):
+        """Момент следующего напоминания вычисляется при сохранении и не лежит в прошлом."""
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.save()
+        self.assertGreaterEqual(habit.next_reminder_at, self.now)
+        self.assertEqual(habit.next_reminder_at.time(), dt_time(9, 0))
+        self.assertEqual((habit.next_reminder_at.date() - date(2025, 9, 1)).days % 2, 0)
+
+    @patch("habits.tasks.send_outbox.delay")
+    def test_dispatch_sends_due_habits_and_advances_them(self, mock_delay):
+        """Диспетчер кладет в outbox только привычки с chat_id и сдвигает все наступившие."""
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_due_reminders()
+
+        mock_delay.assert_called_once_with()
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual(notification.habit_id, self.habit.pk)
+        self.assertEqual(notification.chat_id, "100500")
+        self.assertEqual(
+            notification.text,
+            "Напоминание: Сегодня я буду Выпить воды в 09:00:00 в Home.",
+        )
+        self.assertEqual(notification.scheduled_for, self.now - timedelta(seconds=30))
+
+        self.habit.refresh_from_db()
+        self.habit_without_chat.refresh_from_db()
+        self.assertEqual(
+            self.habit.next_reminder_at,
+            self.now - timedelta(seconds=30) + timedelta(days=2),
+        )
+        self.assertEqual(
+            self.habit_without_chat.next_reminder_at,
+            self.now - timedelta(seconds=30) + timedelta(days=1),
+        )
+
+    @patch("habits.tasks.send_outbox.delay")
+    def test_dispatch_skips_inactive_habits(self, mock_delay):
+        """Неактивные привычки не попадают в рассылку."""
+        Habit.objects.update(is_active=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_due_reminders()
+
+        mock_delay.assert_not_called()
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @patch("habits.tasks.send_outbox.delay")
+    def test_dispatch_is_idempotent_per_reminder(self, mock_delay):
+        """Повторная запись того же напоминания в outbox не создает дубль."""
+        scheduled_for = self.now - timedelta(seconds=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_due_reminders()
+        Habit.objects.filter(pk=self.habit.pk).update(next_reminder_at=scheduled_for)
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_due_reminders()
+
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    @patch("habits.tasks.get_telegram_client")
+    def test_send_reminders_batch(self, mock_client):
+        """Пачка напоминаний уходит только владельцам с привязанным телеграмом."""
+        mock_client.return_value.send_many_concurrently.return_value = [{"ok": True}]
+
+        with self.assertNumQueries(1):
+            results = send_reminders_batch([self.habit.pk, self.habit_without_chat.pk])
+
+        messages = list(
+            mock_client.return_value.send_many_concurrently.call_args.args[0]
+        )
+        self.assertEqual(
+            messages,
+            [("100500", "Напоминание: Сегодня я буду Выпить воды в 09:00:00 в Home.")],
+        )
+        self.assertEqual(results, {self.habit.pk: True})
+
+
+class TelegramClientTestCase(TestCase):
+    def setUp(self):
+        self.client = TelegramClient("token", rate_limiter=LocalTokenBucket(rate=1000))
+
+    def mock_response(self, status_code, payload):
+        response = Mock(status_code=status_code)
+        response.json.return_value = payload
+        return response
+
+    def test_retry_after_is_honoured(self):
+        """После ответа 429 клиент ставит отправку на паузу retry_after и повторяет ее."""
+        self.client.rate_limiter = Mock()
+        with patch.object(
+            self.client.session,
+            "post",
+            side_effect=[
+                self.mock_response(
+                    429, {"ok": False, "parameters": {"retry_after": 3}}
+                ),
+                self.mock_response(200, {"ok": True}),
+            ],
+        ) as mock_post:
+            result = self.client.send_message("100500", "Привет")
+
+        self.assertEqual(result, {"ok": True})
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(self.client.rate_limiter.acquire.call_count, 2)
+        self.client.rate_limiter.pause.assert_called_once_with(3)
+
+    def test_send_many_collects_errors(self):
+        """Ошибка одного сообщения не прерывает отправку пачки."""
+        with patch.object(
+            self.client.session,
+            "post",
+            side_effect=[
+                requests.ConnectionError("connection reset"),
+                self.mock_response(200, {"ok": True}),
+            ],
+        ):
+            results = self.client.send_many([("1", "Первое"), ("2", "Второе")])
+
+        self.assertEqual(
+            results,
+            [{"ok": False, "description": "connection reset"}, {"ok": True}],
+        )
+
+    def test_send_many_concurrently_keeps_order(self):
+        """Параллельная отправка возвращает результаты в порядке сообщений."""
+
+        def post(url, json, timeout):
+            time.sleep(0.05 if json["chat_id"] == "1" else 0)
+            return self.mock_response(200, {"ok": True, "chat_id": json["chat_id"]})
+
+        with patch.object(self.client.session, "post", side_effect=post):
+            results = self.client.send_many_concurrently(
+                [("1", "Первое"), ("2", "Второе"), ("3", "Третье")], concurrency=3
+            )
+
+        self.assertEqual([result["chat_id"] for result in results], ["1", "2", "3"])
+
+    def test_send_many_concurrently_on_eventlet(self):
+        """В воркере eventlet пачка отправляется через GreenPool с сохранением порядка."""
+        import eventlet  # noqa: F401
+
+        def post(url, json, timeout):
+            return self.mock_response(200, {"ok": True, "chat_id": json["chat_id"]})
+
+        with (
+            patch.object(self.client.session, "post", side_effect=post),
+            patch("habits.services.running_on_eventlet", return_value=True),
+            patch("habits.services.asyncio.run") as mock_asyncio_run,
+        ):
+            results = self.client.send_many_concurrently(
+                [("1", "Первое"), ("2", "Второе")], concurrency=2
+            )
+
+        mock_asyncio_run.assert_not_called()
+        self.assertEqual([result["chat_id"] for result in results], ["1", "2"])
+
+    def test_reminder_tasks_routing(self):
+        """Напоминания уходят в очередь reminders без сохранения результата."""
+        router = celery_app.amqp.router
+        for task in (send_reminders_batch, send_reminder_with_bot):
+            self.assertEqual(router.route({}, task.name)["queue"].name, "reminders")
+            self.assertTrue(celery_app.tasks[task.name].ignore_result)
+        self.assertEqual(
+            router.route({}, dispatch_due_reminders.name)["queue"].name, "default"
+        )
+
+    def test_local_token_bucket_limits_rate(self):
+        """Когда токены закончились, bucket ждет их пополнения."""
+        bucket = LocalTokenBucket(rate=2, capacity=1)
+        bucket.acquire()
+        with patch(
+            "habits.services.time.sleep", side_effect=RuntimeError
+        ) as mock_sleep:
+            with self.assertRaises(RuntimeError):
+                bucket.acquire()
+        self.assertGreater(mock_sleep.call_args.args[0], 0)
+
+
+class PublicHabitCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        stats_buffer.take_all()
+        self.owner = User.objects.create(email="owner@example.com")
+        self.admin = User.objects.create(email="admin@example.com", is_staff=True)
+        self.habit = Habit.objects.create(
+            owner=self.owner,
+            action="Плавать",
+            time_deadline="19:00",
+            periodicity=1,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=False,
+            is_public=True,
+        )
+        self.url = reverse("habits:public_habits_list")
+
+    def test_repeated_request_is_served_from_cache(self):
+        """Повторный запрос той же страницы не обращается к БД."""
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_unpublishing_invalidates_cache(self):
+        """Снятие привычки с публикации сбрасывает закэшированные страницы."""
+        self.client.get(self.url)
+
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.is_public = False
+        with self.captureOnCommitCallbacks(execute=True):
+            habit.save()
+            # До коммита поколение не меняется, страница из старых данных не
+            # попадает в кэш под новым поколением
+            self.assertEqual(get_generation(), 1)
+        self.assertEqual(get_generation(), 2)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 0)
+
+    def test_stale_copy_is_served_while_page_is_rebuilt(self):
+        """Пока другой воркер пересобирает истекшую страницу, отдается устаревшая копия."""
+        self.client.get(self.url)
+        cache.delete(f"public_habits:1:{self.page_key()}")
+        cache.add(f"public_habits:lock:{self.page_key()}", 1)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(get_stats()["stale"], 1)
+
+    @patch("habits.cache.WAIT_TIMEOUT", 0)
+    def test_stale_copy_is_not_served_after_invalidation(self):
+        """Устаревшая копия прошлого поколения не отдается после снятия с публикации."""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.filter(pk=self.habit.pk).update(is_public=False)
+            invalidate_public_feed()
+        cache.add(f"public_habits:lock:{self.page_key()}", 1)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data["count"], 0)
+        self.assertEqual(get_stats()["stale"], 0)
+
+    @patch("habits.cache.WAIT_TIMEOUT", 0)
+    def test_foreign_lock_is_kept(self):
+        """Не дождавшись чужой сборки, запрос собирает страницу сам и не снимает чужую блокировку."""
+        lock_key = f"public_habits:lock:{self.page_key()}"
+        cache.add(lock_key, 1)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(cache.get(lock_key), 1)
+
+    def test_hit_skips_shared_stats(self):
+        """Попадание не обращается к общему кэшу за статистикой до ее сброса."""
+        self.client.get(self.url)
+        get_stats()
+
+        with patch("habits.cache.cache", wraps=cache) as shared:
+            self.client.get(self.url)
+        self.assertEqual(
+            [call[0] for call in shared.method_calls], ["get_or_set", "get"]
+        )
+        self.assertEqual(get_stats()["hit"], 1)
+
+    def test_stats_are_available_to_admin(self):
+        """Счетчики кэша доступны администратору."""
+        self.client.get(self.url)
+        self.client.get(self.url)
+        stats_url = reverse("habits:public_habits_cache_stats")
+
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(
+            self.client.get(stats_url).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(stats_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["hit"], 1)
+        self.assertEqual(response.data["miss"], 1)
+
+    def page_key(self):
+        request = Request(APIRequestFactory().get(self.url))
+        return get_page_key(request)
+
+
+class PublicHabitSearchTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email="search@example.com")
+        self.habits = {
+            name: Habit.objects.create(
+                owner=self.owner,
+                action=action,
+                location=location,
+                time_deadline="09:00",
+                periodicity=1,
+                date_deadline="2025-09-01",
+                is_enjoyable=False,
+                is_public=is_public,
+            )
+            for name, action, location, is_public in (
+                ("swim", "Плавать", "Бассейн", True),
+                ("pool", "Плавать в бассейне", "Бассейн", True),
+                ("run", "Бегать по утрам", "Park", True),
+                ("private", "Плавать в бассейне", "Бассейн", False),
+            )
+        }
+        self.url = reverse("habits:public_habits_list")
+
+    def search(self, text, **params):
+        response = self.client.get(self.url, {"search": text, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [habit["id"] for habit in response.data["results"]]
+
+    def test_results_are_ranked(self):
+        """Слово в разных формах находится, совпадения в действии и месте выше."""
+        self.assertEqual(
+            self.search("бассейна"),
+            [self.habits["pool"].pk, self.habits["swim"].pk],
+        )
+        self.assertEqual(self.search("бегал утром"), [self.habits["run"].pk])
+
+    def test_substring_search(self):
+        """Подстрока от трех символов ищется без учета регистра."""
+        self.assertEqual(self.search("PAR"), [self.habits["run"].pk])
+        self.assertEqual(self.search("pa"), [])
+
+    def test_search_is_paginated(self):
+        response = self.client.get(self.url, {"search": "плавать", "page_size": 1})
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            self.search("плавать", cursor=""),
+            [self.habits["swim"].pk, self.habits["pool"].pk],
+        )
+
+    def test_empty_and_invalid_search(self):
+        self.assertEqual(len(self.search(" ")), 3)
+        response = self.client.get(self.url, {"search": "х" * 101})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_uses_index(self):
+        """Полнотекстовое условие совпадает с выражением индекса."""
+        view = PublicHabitListAPIView()
+        # Короткий запрос без поиска по подстроке: без pg_trgm условие ILIKE
+        # не покрыто индексом и план свелся бы к фильтру по всей ленте
+        view.request = Request(APIRequestFactory().get("/", {"search": "ум"}))
+        queryset = view.filter_queryset(view.get_queryset())
+        # На нескольких строках план зависит от статистики, оставленной другими
+        # тестами (ANALYZE не откатывается): лента наполняется несовпадающими
+        # привычками, чтобы полнотекстовое условие было избирательным
+        Habit.objects.bulk_create(
+            Habit(
+                owner=self.owner,
+                action=f"Прочее {number}",
+                location="Home",
+                time_deadline="09:00",
+                date_deadline="2025-09-01",
+                is_enjoyable=False,
+                is_public=True,
+            )
+            for number in range(2000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE habits_habit")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        self.assertIn("habit_public_search_idx", queryset.explain())
+
+
+class HabitAdoptionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(email="author@example.com")
+        self.user = User.objects.create(email="adopter@example.com")
+        self.music = Habit.objects.create(
+            owner=self.author,
+            action="Послушать музыку",
+            location="Home",
+            time_deadline="09:00",
+            is_enjoyable=True,
+        )
+        self.habits = [
+            Habit.objects.create(
+                owner=self.author,
+                action=action,
+                location="Park",
+                time_deadline="08:00",
+                periodicity=2,
+                time_to_complete=1,
+                date_deadline="2025-09-01",
+                is_enjoyable=False,
+                associated_habit=self.music,
+                is_public=True,
+            )
+            for action in ("Бегать", "Ходить", "Плавать")
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def adopt(self, habit):
+        return self.client.post(reverse("habits:habit_adopt", args=[habit.pk]))
+
+    def test_adopt_copies_habit(self):
+        source = self.habits[0]
+        response = self.adopt(source)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        copy = Habit.objects.get(pk=response.data["id"])
+        self.assertEqual(copy.owner, self.user)
+        self.assertEqual(copy.adopted_from, source)
+        self.assertEqual((copy.action, copy.location), ("Бегать", "Park"))
+        self.assertFalse(copy.is_public)
+        self.assertEqual(copy.date_deadline, timezone.localdate())
+        self.assertIsNotNone(copy.next_reminder_at)
+        # Непубличная приятная привычка автора не копируется
+        self.assertIsNone(copy.associated_habit)
+        self.assertFalse(Habit.objects.filter(adopted_from=self.music).exists())
+
+        source.refresh_from_db()
+        self.assertEqual(source.adoptions_count, 1)
+        self.assertEqual(source.version, 2)
+        self.assertEqual(source.popularity, 0)
+
+    def test_associated_copy_is_reused(self):
+        Habit.objects.filter(pk=self.music.pk).update(is_public=True)
+        first = self.adopt(self.habits[0]).data
+        second = self.adopt(self.habits[1]).data
+        # Публичная приятная привычка копируется вместе с полезной один раз
+        associated = Habit.objects.get(pk=first["associated_habit"])
+        self.assertEqual(associated.owner, self.user)
+        self.assertEqual(associated.adopted_from, self.music)
+        self.assertEqual(first["associated_habit"], second["associated_habit"])
+        self.assertEqual(Habit.objects.filter(owner=self.user).count(), 3)
+
+    def test_deleting_source_changes_adopter_etag(self):
+        """Удаление исходной привычки меняет ETag списка у добавивших ее."""
+        url = reverse("habits:habits_list")
+        self.adopt(self.habits[0])
+        etag = self.client.get(url)["ETag"]
+
+        self.habits[0].delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["results"][0]["adopted_from"])
+
+    def test_adopt_twice(self):
+        self.adopt(self.habits[0])
+        response = self.adopt(self.habits[0])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.habits[0].refresh_from_db()
+        self.assertEqual(self.habits[0].adoptions_count, 1)
+
+    def test_adopt_not_allowed(self):
+        private = Habit.objects.create(
+            owner=self.author,
+            action="Читать",
+            location="Home",
+            time_deadline="21:00",
+            is_enjoyable=False,
+            reward="Чай",
+        )
+        self.assertEqual(self.adopt(private).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.author)
+        response = self.adopt(self.habits[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=None)
+        response = self.adopt(self.habits[0])
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_popular_ordering(self):
+        url = reverse("habits:public_habits_list")
+        self.adopt(self.habits[2])
+        for number in range(2):
+            user = User.objects.create(email=f"fan{number}@example.com")
+            self.client.force_authenticate(user=user)
+            self.adopt(self.habits[1])
+            self.adopt(self.habits[2])
+        popular = self.client.get(url, {"ordering": "popular"})
+        # Рейтинг еще не пересчитан: порядок по id
+        self.assertEqual(
+            [habit["id"] for habit in popular.data["results"]],
+            [habit.pk for habit in self.habits],
+        )
+
+        with self.assertNumQueries(3):
+            self.assertEqual(refresh_popularity(batch_size=1), 2)
+        self.assertEqual(refresh_popularity(), 0)
+
+        popular = self.client.get(url, {"ordering": "popular"})
+        self.assertEqual(
+            [
+                (habit["id"], habit["adoptions_count"])
+                for habit in popular.data["results"]
+            ],
+            [(self.habits[2].pk, 3), (self.habits[1].pk, 2), (self.habits[0].pk, 0)],
+        )
+        response = self.client.get(url, {"ordering": "oldest"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_popular_ordering_uses_index(self):
+        view = PublicHabitListAPIView()
+        view.request = Request(APIRequestFactory().get("/", {"ordering": "popular"}))
+        queryset = view.filter_queryset(view.get_queryset())[:5]
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        self.assertIn("habit_public_popular_idx", queryset.explain())
+
+
+class HabitETagTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email="owner@example.com")
+        self.habit = Habit.objects.create(
+            owner=self.owner,
+            action="Читать книгу",
+            time_deadline="20:00",
+            periodicity=1,
+            time_to_complete=2,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=False,
+            is_public=True,
+        )
+        self.detail_url = reverse("habits:habit_detail", kwargs={"pk": self.habit.pk})
+        self.update_url = reverse("habits:habit_update", kwargs={"pk": self.habit.pk})
+        self.client.force_authenticate(user=self.owner)
+
+    def test_detail_not_modified(self):
+        """Детальный просмотр с актуальным ETag возвращает 304 без тела."""
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+    def test_list_etag_changes_after_update(self):
+        """ETag списка меняется после изменения привычки."""
+        for url in (
+            reverse("habits:habits_list"),
+            reverse("habits:public_habits_list"),
+        ):
+            etag = self.client.get(url)["ETag"]
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            habit = Habit.objects.get(pk=self.habit.pk)
+            habit.action = f"{habit.action}!"
+            with self.captureOnCommitCallbacks(execute=True):
+                habit.save()
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_update_locks_habit_row(self):
+        """Изменение и без If-Match выбирает привычку с блокировкой строки."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                self.update_url, {"location": "Park"}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT") and '"habits_habit"' in query["sql"]
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertIn("FOR UPDATE", selects[0])
+        self.assertEqual(response["ETag"], f'"habit-{self.habit.pk}-v2"')
+
+    def test_stale_if_match_checked_before_validation(self):
+        """Устаревший ETag дает 412, даже если тело запроса неверно."""
+        etag = self.client.get(self.detail_url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.get(pk=self.habit.pk).save()
+
+        response = self.client.patch(
+            self.update_url,
+            {"periodicity": 100},
+            format="json",
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_update_with_stale_if_match_fails(self):
+        """Изменение по устаревшему ETag отклоняется с 412."""
+        etag = self.client.get(self.detail_url)["ETag"]
+        Habit.objects.get(pk=self.habit.pk).save()
+
+        response = self.client.patch(
+            self.update_url, {"location": "Park"}, format="json", HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.location, "Home")
+
+    def test_update_with_current_if_match_succeeds(self):
+        """Изменение по актуальному ETag применяется и возвращает новый ETag."""
+        etag = self.client.get(self.detail_url)["ETag"]
+
+        response = self.client.patch(
+            self.update_url, {"location": "Park"}, format="json", HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response["ETag"], self.client.get(self.detail_url)["ETag"])
+
+
+class HabitBulkAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="user@example.com")
+        self.other_user = User.objects.create(email="other@example.com")
+        self.enjoyable_habits = [
+            Habit.objects.create(
+                owner=self.user,
+                action=f"Послушать музыку {i}",
+                time_deadline="10:00",
+                periodicity=1,
+                location="Home",
+                date_deadline="2025-09-01",
+                is_enjoyable=True,
+            )
+            for i in range(10)
+        ]
+        self.url = reverse("habits:habit_bulk")
+        self.client.force_authenticate(user=self.user)
+
+    def build_batch(self, size):
+        return [
+            {
+                "action": f"Сделать зарядку {i}",
+                "time_deadline": "08:00",
+                "periodicity": 1,
+                "time_to_complete": 2,
+                "is_enjoyable": False,
+                "location": "Home",
+                "associated_habit": self.enjoyable_habits[i].pk,
+            }
+            for i in range(size)
+        ]
+
+    def test_bulk_create_uses_constant_number_of_queries(self):
+        """Число запросов при пакетном создании не зависит от размера пачки."""
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, self.build_batch(2), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, self.build_batch(10), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(
+            Habit.objects.filter(owner=self.user, is_enjoyable=False).count(), 12
+        )
+        self.assertFalse(
+            Habit.objects.filter(
+                owner=self.user, next_reminder_at__isnull=True
+            ).exists()
+        )
+
+    def test_bulk_create_returns_errors_per_item(self):
+        """Ошибки валидации возвращаются по элементам, пачка не сохраняется."""
+        batch = self.build_batch(3)
+        batch[1]["reward"] = "Мороженое"
+        batch[2]["associated_habit"] = 999999
+
+        response = self.client.post(self.url, batch, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("non_field_errors", response.data[1])
+        self.assertIn("associated_habit", response.data[2])
+        self.assertFalse(Habit.objects.filter(is_enjoyable=False).exists())
+
+    def test_bulk_update_only_own_habits(self):
+        """Пакетное изменение применяется к своим привычкам и отклоняет чужие."""
+        foreign_habit = Habit.objects.create(
+            owner=self.other_user,
+            action="Чужая привычка",
+            time_deadline="10:00",
+            periodicity=1,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=True,
+        )
+        batch = [
+            {"id": self.enjoyable_habits[0].pk, "location": "Park"},
+            {"id": self.enjoyable_habits[1].pk, "location": "Gym"},
+        ]
+
+        response = self.client.patch(self.url, batch, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.enjoyable_habits[0].refresh_from_db()
+        self.assertEqual(self.enjoyable_habits[0].location, "Park")
+        self.assertEqual(self.enjoyable_habits[0].version, 2)
+
+        response = self.client.patch(
+            self.url, [{"id": foreign_habit.pk, "location": "Park"}], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", response.data[0])
+
+    def test_bulk_update_invalidates_public_feed_after_commit(self):
+        """Кэш публичной ленты сбрасывается после коммита пачки, а не внутри транзакции."""
+        Habit.objects.filter(pk=self.enjoyable_habits[0].pk).update(is_public=True)
+        batch = self.build_batch(1)
+        batch[0]["is_public"] = True
+
+        for method, data in (
+            (self.client.post, batch),
+            (
+                self.client.patch,
+                [{"id": self.enjoyable_habits[0].pk, "is_public": False}],
+            ),
+        ):
+            generation = get_generation()
+            with self.captureOnCommitCallbacks() as callbacks:
+                method(self.url, data, format="json")
+                self.assertEqual(get_generation(), generation)
+            for callback in callbacks:
+                callback()
+            self.assertEqual(get_generation(), generation + 1)
+
+
+class BenchmarkCommandsTestCase(TestCase):
+
+    def test_seed_habits_mix(self):
+        """Сидер создает заданное число пользователей и привычек с приятными и связанными."""
+        call_command(
+            "seed_habits", users=4, habits=10, random_seed=1, stdout=StringIO()
+        )
+
+        self.assertEqual(User.objects.filter(email__startswith="seed-").count(), 4)
+        self.assertEqual(Habit.objects.count(), 40)
+        self.assertEqual(Habit.objects.filter(is_enjoyable=True).count(), 12)
+        self.assertTrue(Habit.objects.filter(associated_habit__isnull=False).exists())
+        self.assertFalse(
+            Habit.objects.filter(
+                associated_habit__isnull=False, reward__isnull=False
+            ).exists()
+        )
+
+    def test_explain_habit_queries(self):
+        """Замер планов работает на текущей схеме, в том числе без pg_trgm."""
+        stdout = StringIO()
+        call_command("explain_habit_queries", seed=20, users=2, runs=1, stdout=stdout)
+
+        self.assertEqual(Habit.objects.count(), 20)
+        self.assertIn("dispatch_due_reminders:", stdout.getvalue())
+        # Индексы, удаленные для замера "до", возвращены откатом транзакции
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_indexes WHERE indexname = 'habit_owner_filter_idx'"
+            )
+            self.assertIsNotNone(cursor.fetchone())
+
+    def test_benchmark_baseline_and_regression(self):
+        """Первый прогон пишет базу, рост числа запросов относительно нее - ошибка."""
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = os.path.join(directory, "baseline.json")
+            options = {"iterations": 2, "warmup": 0, "baseline": baseline_path}
+            call_command("benchmark_api", stdout=StringIO(), **options)
+
+            with open(baseline_path, encoding="utf-8") as file:
+                baseline = json.load(file)
+            self.assertIn("GET habits:habits_list", baseline)
+            self.assertIn("GET user:user-list", baseline)
+            self.assertIn("HabitSerializer.is_valid", baseline)
+            self.assertEqual(baseline["GET habits:habit_detail"]["status"], 200)
+            self.assertFalse(
+                User.objects.filter(email__startswith="benchmark-").exists()
+            )
+
+            baseline["GET habits:habits_list"]["queries"] = 0
+            with open(baseline_path, "w", encoding="utf-8") as file:
+                json.dump(baseline, file)
+            with self.assertRaisesMessage(CommandError, "GET habits:habits_list"):
+                call_command(
+                    "benchmark_api", stdout=StringIO(), threshold=1000, **options
+                )
+
+
+class ServerTimingMetricsTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="timing@user.ru")
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header(self):
+        """Ответ содержит время SQL с числом запросов, view, рендеринга и общее."""
+        response = self.client.get(reverse("habits:habits_list"))
+
+        timing = response["Server-Timing"]
+        for metric in ("db;dur=", "view;dur=", "render;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    async def test_server_timing_under_asgi(self):
+        """Под ASGI SQL выполняется в потоке sync_to_async, но попадает в замер запроса."""
+        db_queries = {"method": "GET", "route": "habits:habits_list"}
+        before = REGISTRY.get_sample_value("http_request_db_queries_sum", db_queries)
+        response = await self.async_client.get(
+            reverse("habits:habits_list"),
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=(?!0\.00;)\d+\.\d+;desc="[1-9]\d* queries"')
+        after = REGISTRY.get_sample_value("http_request_db_queries_sum", db_queries)
+        self.assertGreater(after, before or 0)
+
+    def test_metrics_by_route(self):
+        """Гистограммы /metrics размечены именем маршрута, есть счетчики кэша ленты."""
+        self.client.get(reverse("habits:habits_list"))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",route="habits:habits_list"}',
+            body,
+        )
+        self.assertIn('http_request_db_queries_bucket{le="0.0"', body)
+        self.assertIn('public_habits_cache_total{result="hit"}', body)
+
+    def test_metrics_access(self):
+        """Метрики отдаются адресам из METRICS_ALLOWED_IPS и сотрудникам."""
+        url = reverse("metrics")
+        external = {"REMOTE_ADDR": "203.0.113.5"}
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url, **external)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url, **external)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        staff = User.objects.create(email="metrics-staff@user.ru", is_staff=True)
+        self.client.force_authenticate(user=staff)
+        response = self.client.get(url, **external)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("http_request_duration_seconds", response.content.decode())
+
+        with patch(
+            "config.metrics.METRICS_NETWORKS",
+            [ipaddress.ip_network("203.0.113.0/24")],
+        ):
+            self.client.force_authenticate(user=None)
+            response = self.client.get(url, **external)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_pool_stats_exported(self):
+        """Статистика пула переносится в метрики, счетчики копятся между сборами."""
+        pool = Mock()
+        pool.pop_stats.side_effect = [
+            {
+                "pool_max": 10,
+                "pool_size": 4,
+                "pool_available": 1,
+                "requests_waiting": 2,
+                "requests_num": 30,
+                "requests_queued": 5,
+                "requests_wait_ms": 1500,
+            },
+            {"pool_max": 10, "pool_size": 4, "pool_available": 4, "requests_num": 3},
+        ]
+        wrapper = Mock(alias="pooled", pool=pool)
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, {"alias": "pooled", **labels})
+
+        with patch("config.metrics.connections.all", return_value=[wrapper]):
+            collect_pool_stats()
+            self.assertEqual(sample("db_pool_connections", state="in_use"), 3)
+            self.assertEqual(sample("db_pool_requests_waiting"), 2)
+            self.assertEqual(sample("db_pool_wait_seconds_total"), 1.5)
+
+            response = metrics(APIRequestFactory().get("/metrics"))
+
+        self.assertIn(
+            'db_pool_max_size{alias="pooled"} 10.0', response.content.decode()
+        )
+        self.assertEqual(sample("db_pool_connections", state="in_use"), 0)
+        self.assertEqual(sample("db_pool_connections", state="idle"), 4)
+        self.assertEqual(sample("db_pool_requests_total"), 33)
+
+
+class ValuesListSerializerTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="values@user.ru")
+        self.enjoyable_habit = Habit.objects.create(
+            owner=self.user,
+            action="Выпить кофе",
+            location="Home",
+            time_deadline="09:30:15",
+            is_enjoyable=True,
+            is_public=True,
+        )
+        Habit.objects.create(
+            owner=self.user,
+            action="Сделать зарядку",
+            location="Park",
+            time_deadline="07:00",
+            is_enjoyable=False,
+            associated_habit=self.enjoyable_habit,
+            is_public=True,
+        )
+        Habit.objects.create(
+            owner=None,
+            action="Прочитать 10 страниц",
+            location="Home",
+            time_deadline="21:00",
+            is_enjoyable=False,
+            reward="Серия сериала",
+        )
+
+    def assert_same_json(self, serializer_class):
+        queryset = Habit.objects.order_by("id")
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        serializer = serializer_class(many=True)
+        rows = queryset.values(*serializer.get_values_fields())
+        with self.assertNumQueries(1):
+            actual = JSONRenderer().render(serializer_class(rows, many=True).data)
+        self.assertEqual(actual, expected)
+
+    def test_habit_serializer_values_json(self):
+        """Режим values() дает тот же JSON, включая даты, время и пустые связи."""
+        self.assert_same_json(HabitSerializer)
+
+    def test_public_serializer_values_json(self):
+        self.assert_same_json(PublicListHabitSerializer)
+
+    def test_cursor_pagination_on_values(self):
+        """Keyset-пагинация работает со словарями из values()."""
+        response = self.client.get(
+            reverse("habits:public_habits_list"), {"cursor": "", "page_size": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], self.enjoyable_habit.pk)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertNotEqual(response.data["results"][0]["id"], self.enjoyable_habit.pk)
+
+
+class OwnerVisibilityTestCase(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email="visibility-owner@user.ru")
+        self.other_user = User.objects.create(email="visibility-other@user.ru")
+        self.habit = Habit.objects.create(
+            owner=self.owner,
+            action="Сделать зарядку",
+            location="Home",
+            time_deadline="08:00",
+            is_enjoyable=False,
+            reward="Прогулка",
+        )
+
+    def get_habit_selects(self, context):
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT") and '"habits_habit"' in query["sql"]
+        ]
+
+    def test_detail_single_query(self):
+        """Просмотр: выборка и проверка прав одним запросом, 404 и 403 различаются."""
+        self.client.force_authenticate(user=self.other_user)
+        url = reverse("habits:habit_detail", args=[self.habit.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("habits:habit_detail", args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_single_select(self):
+        """Изменение: одна выборка привычки перед UPDATE, чужая привычка - 403."""
+        url = reverse("habits:habit_update", args=[self.habit.pk])
+        self.client.force_authenticate(user=self.other_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(url, {"location": "Park"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            response.data["detail"], "У Вас нет прав редактировать эту привычку."
+        )
+        self.assertEqual(len(self.get_habit_selects(context)), 1)
+
+        self.client.force_authenticate(user=self.owner)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(url, {"location": "Park"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.get_habit_selects(context)), 1)
+
+    def test_delete_foreign_habit_single_query(self):
+        self.client.force_authenticate(user=self.other_user)
+        with self.assertNumQueries(1):
+            response = self.client.delete(
+                reverse("habits:habit_delete", args=[self.habit.pk])
+            )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Habit.objects.filter(pk=self.habit.pk).exists())
+
+
+class HabitCheckInTestCase(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email="checkin-owner@user.ru")
+        self.other_user = User.objects.create(email="checkin-other@user.ru")
+        self.habit = Habit.objects.create(
+            owner=self.owner,
+            action="Сделать зарядку",
+            location="Home",
+            time_deadline="08:00",
+            is_enjoyable=False,
+            reward="Прогулка",
+        )
+        self.url = reverse("habits:habit_checkin", args=[self.habit.pk])
+
+    def test_checkin_once_per_day(self):
+        """Без Redis отметка пишется сразу, повторная за тот же день игнорируется."""
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["habit"], self.habit.pk)
+        self.assertEqual(response.data["day"], timezone.localdate().isoformat())
+
+        self.client.post(self.url)
+        self.assertEqual(
+            HabitCompletion.objects.filter(
+                habit=self.habit, day=timezone.localdate()
+            ).count(),
+            1,
+        )
+
+    def test_checkin_foreign_habit(self):
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post(reverse("habits:habit_checkin", args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(HabitCompletion.objects.exists())
+
+    def test_save_completions_batch(self):
+        """
+        Пачка пишется одним INSERT без дублей и без отметок удаленных привычек,
+        календари обновляются тремя запросами на всю пачку.
+        """
+        today = timezone.localdate()
+        now = timezone.now()
+        checkins = [
+            (self.habit.pk, today, now),
+            (self.habit.pk, today, now + timedelta(minutes=1)),
+            (self.habit.pk, today - timedelta(days=1), now),
+            (9999, today, now),
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            saved = save_completions(checkins)
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(len(statements), 5)
+
+        self.assertEqual(saved, 2)
+        self.assertEqual(HabitCompletion.objects.count(), 2)
+        self.assertEqual(HabitCompletion.objects.get(day=today).completed_at, now)
+        save_completions(checkins)
+        self.assertEqual(HabitCompletion.objects.count(), 2)
+
+
+class HabitStatsTestCase(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email="stats-owner@user.ru")
+        self.habit = Habit.objects.create(
+            owner=self.owner,
+            action="Сделать зарядку",
+            location="Home",
+            time_deadline="08:00",
+            date_deadline=date(2025, 1, 1),
+            is_enjoyable=False,
+            reward="Прогулка",
+        )
+
+    def build_calendars(self, days):
+        calendars = {}
+        for year in {day.year for day in days}:
+            bits = [0] * 366
+            for day in days:
+                if day.year == year:
+                    bits[day.timetuple().tm_yday - 1] = 1
+            calendars[year] = pack_days(bits)
+        return calendars
+
+    def test_daily_streaks(self):
+        """Незавершенный сегодняшний день не прерывает серию, серия идет через Новый год."""
+        today = date(2026, 1, 3)
+        days = [date(2025, 12, 29) + timedelta(days=i) for i in range(5)]
+        days += [date(2025, 6, 1) + timedelta(days=i) for i in range(7)]
+
+        stats = get_habit_stats(self.habit, self.build_calendars(days), 2026, today)
+
+        self.assertEqual(stats["current_streak"], 5)
+        self.assertEqual(stats["longest_streak"], 7)
+        self.assertEqual(stats["completed_days"], 2)
+        self.assertEqual(stats["completion_rate"], 1.0)
+        self.assertEqual(stats["weekdays"]["thu"], 1)
+        self.assertEqual(stats["weekdays"]["fri"], 1)
+
+    def test_periodicity(self):
+        """При периодичности 3 дня серия считается в трехдневных периодах."""
+        self.habit.periodicity = 3
+        today = date(2025, 1, 13)
+        days = [date(2025, 1, 2), date(2025, 1, 6), date(2025, 1, 8)]
+
+        stats = get_habit_stats(self.habit, self.build_calendars(days), 2025, today)
+
+        # Периоды 1-3, 4-6, 7-9 выполнены, 10-12 нет, 13-15 еще идет
+        self.assertEqual(stats["current_streak"], 0)
+        self.assertEqual(stats["longest_streak"], 3)
+        self.assertEqual(stats["completion_rate"], 0.75)
+
+    def test_stats_endpoint(self):
+        """Отметка попадает в календарь, статистика читается двумя запросами."""
+        self.client.force_authenticate(user=self.owner)
+        self.client.post(reverse("habits:habit_checkin", args=[self.habit.pk]))
+        today = timezone.localdate()
+        self.assertTrue(
+            HabitCalendar.objects.filter(habit=self.habit, year=today.year).exists()
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("habits:habit_stats", args=[self.habit.pk])
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["year"], today.year)
+        self.assertEqual(response.data["completed_days"], 1)
+        self.assertEqual(response.data["current_streak"], 1)
+
+        response = self.client.get(
+            reverse("habits:habit_stats", args=[self.habit.pk]),
+            {"year": today.year + 1},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email="export-owner@user.ru")
+        self.other_user = User.objects.create(email="export-other@user.ru")
+        self.staff = User.objects.create(email="export-staff@user.ru", is_staff=True)
+        for i in range(5):
+            Habit.objects.create(
+                owner=self.owner,
+                action=f"Привычка, номер {i}",
+                location="Home",
+                time_deadline="08:00",
+                is_enjoyable=False,
+                reward="Прогулка",
+            )
+        Habit.objects.create(
+            owner=self.other_user,
+            action="Чужая привычка",
+            location="Park",
+            time_deadline="09:00",
+            is_enjoyable=True,
+        )
+
+    def read_csv(self, response):
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        return list(csv.reader(io.StringIO(content)))
+
+    @patch("habits.views.EXPORT_CHUNK_SIZE", 2)
+    def test_export_csv(self):
+        """CSV отдается потоком по кускам, значения совпадают с JSON списка."""
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(reverse("habits:habits_export", args=["csv"]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+        header, *rows = self.read_csv(response)
+        self.assertEqual(header[0], "id")
+        self.assertEqual(len(rows), 5)
+
+        expected = HabitSerializer(
+            Habit.objects.filter(owner=self.owner).order_by("id"), many=True
+        ).data
+        for row, habit in zip(rows, expected):
+            self.assertEqual(row[header.index("action")], habit["action"])
+            self.assertEqual(
+                row[header.index("next_reminder_at")], habit["next_reminder_at"]
+            )
+            self.assertEqual(row[header.index("associated_habit")], "")
+
+    def test_export_xlsx(self):
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(reverse("habits:habits_export", args=["xlsx"]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][0], "id")
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][rows[0].index("action")], "Привычка, номер 0")
+
+    def test_export_escapes_formulas(self):
+        """Текст, похожий на формулу, выгружается строкой, а не формулой."""
+        Habit.objects.create(
+            owner=self.owner,
+            action='=HYPERLINK("http://example.com","x")',
+            location="+7 999",
+            time_deadline="10:00",
+            is_enjoyable=True,
+        )
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(reverse("habits:habits_export", args=["csv"]))
+        header, *rows = self.read_csv(response)
+        self.assertEqual(
+            rows[-1][header.index("action")], '\'=HYPERLINK("http://example.com","x")'
+        )
+        self.assertEqual(rows[-1][header.index("location")], "'+7 999")
+        self.assertEqual(rows[0][header.index("action")], "Привычка, номер 0")
+
+        response = self.client.get(reverse("habits:habits_export", args=["xlsx"]))
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        header, *rows = workbook.active.iter_rows()
+        names = [cell.value for cell in header]
+        cell = rows[-1][names.index("action")]
+        self.assertEqual(cell.data_type, "s")
+        self.assertFalse(str(cell.value).startswith("="))
+        self.assertEqual(rows[-1][names.index("location")].value, "'+7 999")
+
+    def test_export_owner_for_staff_only(self):
+        """Сотрудник выгружает привычки другого пользователя, обычный пользователь - только свои."""
+        url = reverse("habits:habits_export", args=["csv"])
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(url, {"owner": self.owner.pk})
+        self.assertEqual(len(self.read_csv(response)), 2)
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(url, {"owner": self.owner.pk})
+        self.assertEqual(len(self.read_csv(response)), 6)
+
+        response = self.client.get(reverse("habits:habits_export", args=["pdf"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NotificationOutboxTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="outbox@example.com", chat_id="100500")
+        self.habit = Habit.objects.create(
+            owner=self.user,
+            action="Выпить воды",
+            time_deadline="09:00",
+            periodicity=1,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=False,
+        )
+        self.now = timezone.now()
+        NotificationOutbox.objects.bulk_create(
+            [
+                NotificationOutbox(
+                    habit=self.habit,
+                    scheduled_for=self.now - timedelta(days=day),
+                    chat_id="100500",
+                    text=f"Напоминание {day}",
+                    available_at=self.now - timedelta(minutes=day),
+                )
+                for day in range(3)
+            ]
+        )
+
+    def test_claim_batch_leases_rows(self):
+        """Захваченные уведомления не выдаются повторно до конца аренды."""
+        batch = claim_batch(batch_size=2)
+
+        self.assertEqual([row[2] for row in batch], ["Напоминание 2", "Напоминание 1"])
+        self.assertEqual([row[3] for row in batch], [0, 0])
+        self.assertEqual(
+            [row[2] for row in claim_batch(batch_size=10)], ["Напоминание 0"]
+        )
+        self.assertEqual(claim_batch(batch_size=10), [])
+        self.assertEqual(
+            set(NotificationOutbox.objects.values_list("attempts", flat=True)), {1}
+        )
+
+    def test_claim_batch_skips_locked_rows(self):
+        """Строки, заблокированные другим отправителем, пропускаются, а не ожидаются."""
+        with CaptureQueriesContext(connection) as queries:
+            claim_batch(batch_size=10)
+        select = next(
+            q["sql"] for q in queries.captured_queries if "FOR UPDATE" in q["sql"]
+        )
+        self.assertIn("SKIP LOCKED", select)
+
+    @patch("habits.outbox.get_telegram_client")
+    def test_deliver_batch_marks_results(self, mock_client):
+        """Успешные отмечаются отправленными, временные ошибки откладываются, 403 - отказ."""
+        mock_client.return_value.send_many_concurrently.return_value = [
+            {"ok": True},
+            {"ok": False, "error_code": 429, "description": "Too Many Requests"},
+            {"ok": False, "error_code": 403, "description": "bot was blocked"},
+        ]
+        batch = claim_batch(batch_size=10)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(deliver_batch(batch), (1, 2))
+
+        chat_id, text, extra = next(
+            iter(mock_client.return_value.send_many_concurrently.call_args.args[0])
+        )
+        self.assertEqual(
+            extra["reply_markup"]["inline_keyboard"][0][0]["callback_data"],
+            f"checkin:{self.habit.pk}",
+        )
+
+        sent, retried, failed = (
+            NotificationOutbox.objects.get(pk=row[0]) for row in batch
+        )
+        self.assertEqual(sent.status, NotificationOutbox.SENT)
+        self.assertIsNotNone(sent.sent_at)
+        self.assertEqual(retried.status, NotificationOutbox.PENDING)
+        self.assertEqual(retried.last_error, "Too Many Requests")
+        self.assertGreater(retried.available_at, self.now)
+        self.assertEqual(failed.status, NotificationOutbox.FAILED)
+
+    @patch("habits.outbox.OUTBOX_MAX_ATTEMPTS", 1)
+    @patch("habits.outbox.get_telegram_client")
+    def test_send_pending_gives_up_after_max_attempts(self, mock_client):
+        mock_client.return_value.send_many_concurrently.side_effect = lambda messages: [
+            {"ok": False, "error_code": 500} for _ in messages
+        ]
+
+        self.assertEqual(send_pending(batch_size=2), 0)
+
+        self.assertEqual(
+            set(NotificationOutbox.objects.values_list("status", flat=True)),
+            {NotificationOutbox.FAILED},
+        )
+
+    @patch("habits.tasks.OUTBOX_BATCH_SIZE", 3)
+    @patch("habits.outbox.get_telegram_client")
+    def test_send_outbox_task_chain(self, mock_client):
+        """Захват и запись результатов - в default, отправка в Telegram - в reminders."""
+        router = celery_app.amqp.router
+        for task, queue in (
+            (send_outbox, "default"),
+            (send_outbox_batch, "reminders"),
+            (record_outbox_batch, "default"),
+            (link_telegram_chat, "default"),
+        ):
+            self.assertEqual(router.route({}, task.name)["queue"].name, queue)
+
+        with patch("habits.tasks.chain") as mock_chain:
+            self.assertEqual(send_outbox(), 3)
+        (send_step, record_step), _ = mock_chain.call_args
+        batch = send_step.args[0]
+        self.assertEqual(record_step.args, (batch,))
+
+        mock_client.return_value.send_many_concurrently.side_effect = lambda messages: [
+            {"ok": True, "result": {"message_id": 1}} for _ in messages
+        ]
+        # Аргументы задач проходят через JSON: кортежи становятся списками
+        batch = json.loads(json.dumps(batch))
+        with self.assertNumQueries(0):
+            results = send_outbox_batch(batch)
+        self.assertEqual(
+            results[0], {"ok": True, "error_code": None, "description": None}
+        )
+
+        with patch("habits.tasks.send_outbox.delay") as next_claim:
+            record_outbox_batch(json.loads(json.dumps(results)), batch)
+        next_claim.assert_called_once_with()
+        self.assertEqual(
+            set(NotificationOutbox.objects.values_list("status", flat=True)),
+            {NotificationOutbox.SENT},
+        )
+
+    def test_purge_removes_old_finished_rows(self):
+        NotificationOutbox.objects.update(created_at=self.now - timedelta(days=30))
+        NotificationOutbox.objects.filter(text="Напоминание 0").update(
+            status=NotificationOutbox.SENT
+        )
+        NotificationOutbox.objects.filter(text="Напоминание 1").update(
+            status=NotificationOutbox.FAILED
+        )
+
+        self.assertEqual(purge(timedelta(days=7), chunk_size=1), 2)
+        self.assertEqual(
+            list(NotificationOutbox.objects.values_list("text", flat=True)),
+            ["Напоминание 2"],
+        )
+
+    @patch("habits.outbox.get_telegram_client")
+    def test_send_outbox_command_once(self, mock_client):
+        mock_client.return_value.send_many_concurrently.side_effect = lambda messages: [
+            {"ok": True} for _ in messages
+        ]
+        out = StringIO()
+
+        call_command("send_outbox", "--once", "--batch-size", "2", stdout=out)
+
+        self.assertIn("3", out.getvalue())
+        self.assertFalse(
+            NotificationOutbox.objects.filter(
+                status=NotificationOutbox.PENDING
+            ).exists()
+        )
+
+
+@patch("habits.webhooks.TELEGRAM_WEBHOOK_SECRET", "secret")
+class TelegramWebhookTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="bot@example.com", token="link-token")
+        self.habit = Habit.objects.create(
+            owner=self.user,
+            action="Выпить воды",
+            time_deadline="09:00",
+            periodicity=1,
+            location="Home",
+            date_deadline="2025-09-01",
+            is_enjoyable=False,
+        )
+        self.url = reverse("habits:telegram_webhook")
+
+    def post_update(self, update, secret="secret"):
+        return self.client.post(
+            self.url,
+            update,
+            content_type="application/json",
+            headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+        )
+
+    async def test_webhook_requires_secret(self):
+        """Без верного секрета обновления отклоняются; ответ идет через async middleware."""
+        response = await self.async_client.post(
+            self.url,
+            {"update_id": 1},
+            content_type="application/json",
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    @patch("habits.webhooks.link_telegram_chat.delay")
+    def test_start_command_defers_linking(self, mock_delay):
+        message = {
+            "message_id": 1,
+            "chat": {"id": 100500, "type": "private"},
+            "text": "/start link-token",
+        }
+
+        with self.assertNumQueries(0):
+            response = self.post_update({"update_id": 1, "message": message})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_delay.assert_called_once_with("link-token", "100500")
+
+        mock_delay.reset_mock()
+        self.post_update({"update_id": 2, "message": {**message, "text": "/start"}})
+        mock_delay.assert_not_called()
+
+    @patch("habits.tasks.send_telegram_message")
+    def test_link_telegram_chat(self, mock_send):
+        """Чат переходит к владельцу токена, токен становится недействительным."""
+        other = User.objects.create(email="old@example.com", chat_id="100500")
+
+        link_telegram_chat("link-token", "100500")
+
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.chat_id, "100500")
+        self.assertIsNone(self.user.token)
+        self.assertIsNone(other.chat_id)
+        self.assertIn("привязан", mock_send.call_args.args[0])
+
+        link_telegram_chat("link-token", "200")
+        self.assertIn("недействительна", mock_send.call_args.args[0])
+
+    @patch("habits.webhooks.checkin_from_telegram.delay")
+    def test_callback_is_answered_in_webhook_response(self, mock_delay):
+        callback = {
+            "id": "cb-1",
+            "from": {"id": 100500},
+            "data": f"checkin:{self.habit.pk}",
+        }
+
+        with self.assertNumQueries(0):
+            response = self.post_update({"update_id": 1, "callback_query": callback})
+
+        self.assertEqual(
+            response.json(),
+            {
+                "method": "answerCallbackQuery",
+                "callback_query_id": "cb-1",
+                "text": "Выполнение отмечено",
+            },
+        )
+        habit_id, chat_id, day, completed_at = mock_delay.call_args.args
+        self.assertEqual((habit_id, chat_id), (self.habit.pk, "100500"))
+        self.assertEqual(day, timezone.localdate().isoformat())
+
+    def test_checkin_from_telegram_checks_owner(self):
+        """Отметку по кнопке может поставить только владелец привычки."""
+        User.objects.filter(pk=self.user.pk).update(chat_id="100500")
+        completed_at = timezone.now()
+        args = (self.habit.pk, "2025-09-02", completed_at.isoformat())
+
+        checkin_from_telegram(args[0], "200", *args[1:])
+        self.assertFalse(HabitCompletion.objects.exists())
+
+        checkin_from_telegram(args[0], "100500", *args[1:])
+        completion = HabitCompletion.objects.get()
+        self.assertEqual(completion.day, date(2025, 9, 2))
+        self.assertEqual(completion.completed_at, completed_at)
+
+
+class AsyncHabitViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        stats_buffer.take_all()
+        self.factory = APIRequestFactory()
+        self.owner = User.objects.create(email="async@example.com")
+        self.other_user = User.objects.create(email="async-other@example.com")
+        self.habits = Habit.objects.bulk_create(
+            [
+                Habit(
+                    owner=self.owner,
+                    action=f"Привычка {number}",
+                    time_deadline="09:00",
+                    periodicity=1,
+                    location="Home",
+                    date_deadline="2025-09-01",
+                    is_enjoyable=False,
+                    is_public=number % 2 == 0,
+                )
+                for number in range(7)
+            ]
+        )
+
+    def get(self, view_class, params=None, user=None, **kwargs):
+        request = self.factory.get("/", params or {})
+        if user is not None:
+            force_authenticate(request, user=user)
+        view = view_class.as_view()
+        if view_class.view_is_async:
+            view = async_to_sync(view)
+        return view(request, **kwargs).render()
+
+    def assertSameResponse(self, sync_view, async_view, **kwargs):
+        expected = self.get(sync_view, **kwargs)
+        cache.clear()
+        actual = self.get(async_view, **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        self.assertEqual(actual.get("ETag"), expected.get("ETag"))
+        return actual
+
+    def test_list_matches_sync_view(self):
+        """Асинхронный список отдает те же данные и ETag, что и синхронный."""
+        for params in ({}, {"page": 2}, {"cursor": ""}, {"page": 9}):
+            self.assertSameResponse(
+                HabitListAPIView, AsyncHabitListAPIView, params=params, user=self.owner
+            )
+        response = self.get(AsyncHabitListAPIView)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_public_list_matches_sync_view(self):
+        response = self.assertSameResponse(
+            PublicHabitListAPIView, AsyncPublicHabitListAPIView
+        )
+        self.assertEqual(response.data["count"], 4)
+
+        with self.assertNumQueries(0):
+            self.get(AsyncPublicHabitListAPIView)
+        self.assertEqual(get_stats()["hit"], 1)
+
+        response = self.assertSameResponse(
+            PublicHabitListAPIView,
+            AsyncPublicHabitListAPIView,
+            params={"search": "привычка"},
+        )
+        self.assertEqual(response.data["count"], 4)
+
+    def test_retrieve_matches_sync_view(self):
+        """Права и 404 проверяются так же, как в синхронном просмотре."""
+        public, private = self.habits[0], self.habits[1]
+        cases = [
+            (self.other_user, public.pk, status.HTTP_200_OK),
+            (self.other_user, private.pk, status.HTTP_403_FORBIDDEN),
+            (self.owner, private.pk, status.HTTP_200_OK),
+            (self.owner, 9999, status.HTTP_404_NOT_FOUND),
+        ]
+        for user, pk, expected_status in cases:
+            response = self.assertSameResponse(
+                HabitRetrieveAPIView, AsyncHabitRetrieveAPIView, user=user, pk=pk
+            )
+            self.assertEqual(response.status_code, expected_status)
+
+        with self.assertNumQueries(1):
+            self.get(AsyncHabitRetrieveAPIView, user=self.owner, pk=private.pk)
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    def test_load_test_reports_levels(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "load.json")
+            out = StringIO()
+            call_command(
+                "load_test",
+                target=[f"wsgi={self.live_server_url}"],
+                path=["/habits/public/", "/habits/missing/"],
+                concurrency="1,2",
+                duration=0.3,
+                output=output,
+                stdout=out,
+            )
+
+            with open(output, encoding="utf-8") as file:
+                results = json.load(file)
+        levels = results["wsgi"]
+        self.assertEqual([level["concurrency"] for level in levels], [1, 2])
+        self.assertTrue(all(level["requests"] > 0 for level in levels))
+        self.assertTrue(all(level["errors"] > 0 for level in levels))
+        self.assertIn("wsgi: запас по конкурентности 0", out.getvalue())
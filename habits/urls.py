@@ -1,22 +1,58 @@
 from django.urls import path
 
+from config.settings import HABITS_ASYNC_VIEWS
 from habits.apps import HabitsConfig
 from habits.views import (
+    AsyncHabitListAPIView,
+    AsyncHabitRetrieveAPIView,
+    AsyncPublicHabitListAPIView,
     PublicHabitListAPIView,
+    PublicHabitCacheStatsAPIView,
     HabitListAPIView,
+    HabitExportAPIView,
     HabitCreateAPIView,
+    HabitBulkAPIView,
     HabitUpdateAPIView,
     HabitDestroyAPIView,
     HabitRetrieveAPIView,
+    HabitCheckInAPIView,
+    HabitAdoptAPIView,
+    HabitStatsAPIView,
 )
+from habits.webhooks import telegram_webhook
 
 app_name = HabitsConfig.name
 
+# Под ASGI ленту, список и просмотр привычек обслуживают асинхронные view
+if HABITS_ASYNC_VIEWS:
+    public_list_view = AsyncPublicHabitListAPIView
+    list_view = AsyncHabitListAPIView
+    retrieve_view = AsyncHabitRetrieveAPIView
+else:
+    public_list_view = PublicHabitListAPIView
+    list_view = HabitListAPIView
+    retrieve_view = HabitRetrieveAPIView
+
 urlpatterns = [
-    path("public/", PublicHabitListAPIView.as_view(), name="public_habits_list"),
-    path("my/", HabitListAPIView.as_view(), name="habits_list"),
+    path("public/", public_list_view.as_view(), name="public_habits_list"),
+    path(
+        "public/cache-stats/",
+        PublicHabitCacheStatsAPIView.as_view(),
+        name="public_habits_cache_stats",
+    ),
+    path("my/", list_view.as_view(), name="habits_list"),
+    path(
+        "my/export/<str:file_type>/",
+        HabitExportAPIView.as_view(),
+        name="habits_export",
+    ),
     path("create/", HabitCreateAPIView.as_view(), name="habit_create"),
+    path("bulk/", HabitBulkAPIView.as_view(), name="habit_bulk"),
     path("<int:pk>/update/", HabitUpdateAPIView.as_view(), name="habit_update"),
-    path("<int:pk>/detail/", HabitRetrieveAPIView.as_view(), name="habit_detail"),
+    path("<int:pk>/detail/", retrieve_view.as_view(), name="habit_detail"),
     path("<int:pk>/delete/", HabitDestroyAPIView.as_view(), name="habit_delete"),
+    path("<int:pk>/check-in/", HabitCheckInAPIView.as_view(), name="habit_checkin"),
+    path("<int:pk>/adopt/", HabitAdoptAPIView.as_view(), name="habit_adopt"),
+    path("<int:pk>/stats/", HabitStatsAPIView.as_view(), name="habit_stats"),
+    path("telegram/webhook/", telegram_webhook, name="telegram_webhook"),
 ]
@@ -1,20 +1,169 @@
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework import serializers, status
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import (
+    GenericAPIView,
     DestroyAPIView,
     RetrieveAPIView,
     UpdateAPIView,
     ListAPIView,
     CreateAPIView,
 )
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.settings import EXPORT_CHUNK_SIZE
+from habits.cache import aget_or_build_page, get_or_build_page, get_stats
+from habits.checkins import record_checkin
+from habits.etags import (
+    PreconditionFailed,
+    aget_queryset_etag,
+    etag_matches,
+    get_data_etag,
+    get_habit_etag,
+    get_queryset_etag,
+)
+from habits.exports import build_xlsx, iter_csv
+from habits.adoptions import adopt_habit
+from habits.filters import HabitFilter, HabitOrderingFilter, HabitSearchFilter
+from habits.models import Habit, HabitCalendar, HabitCompletion
+from habits.paginators import HabitPaginator
+from habits.serializers import (
+    HabitCompletionSerializer,
+    HabitSerializer,
+    PublicListHabitSerializer,
+)
+from habits.streaks import get_habit_stats
+
+
+class OwnerVisibilityMixin:
+    """
+    Права на привычку проверяются в том же SQL-запросе, что и ее выборка:
+    в SELECT добавляется признак is_allowed (владелец, а при allow_public еще и
+    публичная привычка). Нет строки - 404, строка без доступа - 403.
+    """
+
+    allow_public = False
+    permission_denied_message = None
+
+    def get_visibility_condition(self):
+        user = self.request.user
+        condition = Q(owner=user) if user.is_authenticated else Q(pk__in=[])
+        if self.allow_public:
+            condition |= Q(is_public=True)
+        return condition
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .annotate(
+                is_allowed=ExpressionWrapper(
+                    self.get_visibility_condition(), output_field=BooleanField()
+                )
+            )
+        )
+
+    def get_object(self):
+        obj = super().get_object()
+        if not obj.is_allowed:
+            raise PermissionDenied(self.permission_denied_message)
+        return obj
 
-from habits.models import Habit
-from habits.paginators import CustomPaginator
-from habits.serializers import HabitSerializer, PublicListHabitSerializer
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                f"No {queryset.model._meta.object_name} matches the given query."
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        if not obj.is_allowed:
+            raise PermissionDenied(self.permission_denied_message)
+        return obj
+
+
+class ValuesListModelMixin:
+    """
+    Список читается через values() только с полями сериализатора,
+    строки сериализуются без создания моделей.
+    """
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_serializer(many=True).get_values_fields()
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    async def alist(self, request, *args, **kwargs):
+        fields = self.get_serializer(many=True).get_values_fields()
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, self)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([row async for row in queryset], many=True)
+        return Response(serializer.data)
+
+
+class AsyncAPIViewMixin:
+    """
+    Dispatch DRF для view с async-обработчиками. Аутентификация и проверка прав
+    выполняются в потоке (JWT-аутентификация читает пользователя из БД), обработчик
+    работает на event loop и обращается к БД через асинхронный ORM.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
 
 
 @method_decorator(
@@ -23,40 +172,218 @@ from habits.serializers import HabitSerializer, PublicListHabitSerializer
         operation_summary="Список личных привычек",
     ),
 )
-class HabitListAPIView(ListAPIView):
+class HabitListAPIView(ValuesListModelMixin, ListAPIView):
     """
     Получение списка привычек, созданных текущим пользователем. Требуются авторизация.
     Суперпользователь и модератор могут просматривать весь список привычек.
-    Реализована пагинация по 5 элементов на странице.
+    Реализована пагинация по 5 элементов на странице, с ?cursor= - keyset-пагинация.
+    Ответ содержит ETag, на If-None-Match с тем же ETag возвращается 304.
+    Фильтры: is_active, is_enjoyable, is_public, диапазон date_deadline_after/_before
+    и окно времени time_deadline_after/_before.
     """
 
     serializer_class = HabitSerializer
-    pagination_class = CustomPaginator
+    pagination_class = HabitPaginator
     permission_classes = [IsAuthenticated]
+    filterset_class = HabitFilter
 
     def get_queryset(self):
         user = self.request.user
-        return Habit.objects.filter(owner=self.request.user)
+        return Habit.objects.filter(owner=self.request.user).order_by("id")
+
+    def list(self, request, *args, **kwargs):
+        etag = get_queryset_etag(self.filter_queryset(self.get_queryset()), request)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Список личных привычек",
+    ),
+)
+class AsyncHabitListAPIView(AsyncAPIViewMixin, HabitListAPIView):
+    """
+    Асинхронный вариант списка личных привычек для запуска под ASGI: ETag, число строк
+    и страница читаются асинхронным ORM, поток не занят на время ожидания БД.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = await aget_queryset_etag(queryset, request)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response = await self.alist(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Выгрузка личных привычек в CSV или XLSX",
+    ),
+)
+class HabitExportAPIView(GenericAPIView):
+    """
+    Выгрузка привычек текущего пользователя в CSV (/my/export/csv/) или XLSX (/my/export/xlsx/).
+    Требуются авторизация. Сотрудник может выгрузить привычки любого пользователя через ?owner=.
+    Привычки читаются серверным курсором по EXPORT_CHUNK_SIZE строк, CSV отдается потоком,
+    XLSX собирается на диске в режиме write-only, поэтому память не растет с числом строк.
+    """
+
+    serializer_class = HabitSerializer
+    permission_classes = [IsAuthenticated]
+    content_types = {
+        "csv": "text/csv; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+
+    def get_queryset(self):
+        owner = self.request.user
+        if owner.is_staff and "owner" in self.request.query_params:
+            owner = serializers.IntegerField().run_validation(
+                self.request.query_params["owner"]
+            )
+        return Habit.objects.filter(owner=owner).order_by("id")
+
+    def get(self, request, file_type, *args, **kwargs):
+        if file_type not in self.content_types:
+            raise Http404
+        queryset = self.get_queryset()
+        serializer = self.get_serializer(many=True)
+        filename = f"habits-{timezone.localdate().isoformat()}.{file_type}"
+
+        if file_type == "csv":
+            response = StreamingHttpResponse(
+                iter_csv(queryset, serializer, EXPORT_CHUNK_SIZE),
+                content_type=self.content_types[file_type],
+            )
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        file = build_xlsx(queryset, serializer.get_values_fields(), EXPORT_CHUNK_SIZE)
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=filename,
+            content_type=self.content_types[file_type],
+        )
 
 
 @method_decorator(
     name="get",
     decorator=swagger_auto_schema(
         operation_summary="Список публичных привычек",
+        manual_parameters=[
+            openapi.Parameter(
+                HabitSearchFilter.search_param,
+                openapi.IN_QUERY,
+                description="Поиск по действию и месту",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                HabitOrderingFilter.ordering_param,
+                openapi.IN_QUERY,
+                description="popular - сначала самые популярные",
+                type=openapi.TYPE_STRING,
+                enum=list(HabitOrderingFilter.orderings),
+            ),
+        ],
     ),
 )
-class PublicHabitListAPIView(ListAPIView):
+class PublicHabitListAPIView(ValuesListModelMixin, ListAPIView):
     """
-    Получение списка публичных привычек. Доступно для всех пользователей.
-    Реализована пагинация по 5 элементов на странице.
+    Получение списка активных публичных привычек. Доступно для всех пользователей.
+    Страницы кэшируются в Redis и сбрасываются при изменении публичных привычек.
+    ETag вычисляется по содержимому страницы и хранится вместе с ней в кэше.
+    Реализована пагинация по 5 элементов на странице, с ?cursor= - keyset-пагинация.
+    ?search= ищет по действию и месту, результаты упорядочены по релевантности,
+    ?ordering=popular - по рейтингу популярности (в keyset-пагинации - всегда по id).
     """
 
     serializer_class = PublicListHabitSerializer
-    pagination_class = CustomPaginator
+    pagination_class = HabitPaginator
     permission_classes = (AllowAny,)
+    filter_backends = [DjangoFilterBackend, HabitSearchFilter, HabitOrderingFilter]
 
     def get_queryset(self):
-        return Habit.objects.filter(is_public=True)
+        return Habit.objects.filter(is_public=True, is_active=True).order_by("id")
+
+    def list(self, request, *args, **kwargs):
+        page = get_or_build_page(request, self.build_page)
+        if etag_matches(request.headers.get("If-None-Match"), page["etag"]):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": page["etag"]}
+            )
+        return Response(page["data"], headers={"ETag": page["etag"]})
+
+    def build_page(self):
+        data = super().list(self.request).data
+        return {"data": data, "etag": get_data_etag(data)}
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Список публичных привычек",
+        manual_parameters=[
+            openapi.Parameter(
+                HabitSearchFilter.search_param,
+                openapi.IN_QUERY,
+                description="Поиск по действию и месту",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                HabitOrderingFilter.ordering_param,
+                openapi.IN_QUERY,
+                description="popular - сначала самые популярные",
+                type=openapi.TYPE_STRING,
+                enum=list(HabitOrderingFilter.orderings),
+            ),
+        ],
+    ),
+)
+class AsyncPublicHabitListAPIView(AsyncAPIViewMixin, PublicHabitListAPIView):
+    """
+    Асинхронный вариант публичной ленты для запуска под ASGI: кэш, ожидание чужой
+    сборки страницы и сама сборка не занимают поток.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        page = await aget_or_build_page(request, self.abuild_page)
+        if etag_matches(request.headers.get("If-None-Match"), page["etag"]):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": page["etag"]}
+            )
+        return Response(page["data"], headers={"ETag": page["etag"]})
+
+    async def abuild_page(self):
+        data = (await self.alist(self.request)).data
+        return {"data": data, "etag": get_data_etag(data)}
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Статистика кэша публичных привычек",
+    ),
+)
+class PublicHabitCacheStatsAPIView(APIView):
+    """
+    Счетчики попаданий и промахов кэша публичной ленты. Доступно администраторам.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_stats())
 
 
 @method_decorator(
@@ -68,7 +395,7 @@ class PublicHabitListAPIView(ListAPIView):
 class HabitCreateAPIView(CreateAPIView):
     """
     Создание новой привычки. Требуются авторизация.
-    Параллельно создается периодическая задача в зависимости от указанной периодичности привычки.
+    Момент первого напоминания вычисляется по дате, времени и периодичности привычки.
     """
 
     queryset = Habit.objects.all()
@@ -76,6 +403,67 @@ class HabitCreateAPIView(CreateAPIView):
     permission_classes = [IsAuthenticated]
 
 
+@method_decorator(
+    name="post",
+    decorator=swagger_auto_schema(
+        operation_summary="Пакетное создание привычек",
+    ),
+)
+@method_decorator(
+    name="patch",
+    decorator=swagger_auto_schema(
+        operation_summary="Пакетное редактирование привычек",
+    ),
+)
+class HabitBulkAPIView(GenericAPIView):
+    """
+    Пакетное создание (POST) и редактирование (PATCH, у каждого элемента указывается id)
+    привычек текущего пользователя. Требуются авторизация.
+    Пачка проверяется целиком и сохраняется в одной транзакции, ошибки возвращаются по элементам.
+    Число запросов к БД не зависит от размера пачки.
+    """
+
+    serializer_class = HabitSerializer
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 100
+
+    def get_queryset(self):
+        return Habit.objects.filter(owner=self.request.user)
+
+    def get_batch_ids(self):
+        if not isinstance(self.request.data, list):
+            return []
+        return [
+            item["id"]
+            for item in self.request.data
+            if isinstance(item, dict) and isinstance(item.get("id"), int)
+        ]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.max_batch_size
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(owner=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @transaction.atomic
+    def patch(self, request, *args, **kwargs):
+        instances = list(
+            self.get_queryset().filter(id__in=self.get_batch_ids()).select_for_update()
+        )
+        serializer = self.get_serializer(
+            instances,
+            data=request.data,
+            many=True,
+            partial=True,
+            max_length=self.max_batch_size,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+
 @method_decorator(
     name="put",
     decorator=swagger_auto_schema(
@@ -88,22 +476,38 @@ class HabitCreateAPIView(CreateAPIView):
         operation_summary="Частичное редактирование привычки",
     ),
 )
-class HabitUpdateAPIView(UpdateAPIView):
+class HabitUpdateAPIView(OwnerVisibilityMixin, UpdateAPIView):
     """
     Редактирование информации о привычке.
     Доступ к конкретным привычкам есть только у создателя привычки, модератора и суперпользователя.
+    С заголовком If-Match изменение применяется, только если ETag совпадает с текущей версией,
+    иначе возвращается 412 (до проверки тела запроса).
+    Привычка выбирается с блокировкой строки: проверка и увеличение версии не пересекаются
+    с параллельными изменениями, и ETag ответа соответствует записанному телу.
     """
 
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
+    permission_denied_message = "У Вас нет прав редактировать эту привычку."
 
-    def perform_update(self, serializer):
-        user = self.request.user
-        habit = self.get_object()
+    def get_queryset(self):
+        return super().get_queryset().select_for_update(of=("self",))
 
-        if not user == habit.owner:
-            raise PermissionDenied("У Вас нет прав редактировать эту привычку.")
-        serializer.save()
+    def get_object(self):
+        habit = super().get_object()
+        if_match = self.request.headers.get("If-Match")
+        if if_match and not etag_matches(if_match, get_habit_etag(habit)):
+            raise PreconditionFailed()
+        return habit
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response["ETag"] = get_habit_etag(self.habit)
+        return response
+
+    def perform_update(self, serializer):
+        self.habit = serializer.save()
 
 
 @method_decorator(
@@ -112,24 +516,51 @@ class HabitUpdateAPIView(UpdateAPIView):
         operation_summary="Просмотр привычки",
     ),
 )
-class HabitRetrieveAPIView(RetrieveAPIView):
+class HabitRetrieveAPIView(OwnerVisibilityMixin, RetrieveAPIView):
     """
     Просмотр детальной информации о привычке.
     Неавторизованный пользователь может просматривать только публичные привычки.
     Непубличную привычку может просматривать только создатель, модератор и суперпользователь.
+    Ответ содержит ETag по версии привычки, на If-None-Match с тем же ETag возвращается 304.
     """
 
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
+    allow_public = True
+    permission_denied_message = (
+        "У Вас нет прав просматривать информацию об этой привычке."
+    )
 
-    def get_object(self):
-        obj = super().get_object()
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = get_habit_etag(instance)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
-        if not (obj.is_public or obj.owner == self.request.user):
-            raise PermissionDenied(
-                "У Вас нет прав просматривать информацию об этой привычке."
-            )
-        return obj
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={"ETag": etag})
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Просмотр привычки",
+    ),
+)
+class AsyncHabitRetrieveAPIView(AsyncAPIViewMixin, HabitRetrieveAPIView):
+    """
+    Асинхронный вариант просмотра привычки для запуска под ASGI:
+    привычка и права на нее читаются одним запросом через aget().
+    """
+
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        etag = get_habit_etag(instance)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={"ETag": etag})
 
 
 @method_decorator(
@@ -138,18 +569,97 @@ class HabitRetrieveAPIView(RetrieveAPIView):
         operation_summary="Удаление привычки",
     ),
 )
-class HabitDestroyAPIView(DestroyAPIView):
+class HabitDestroyAPIView(OwnerVisibilityMixin, DestroyAPIView):
     """
     Владелец привычки может удалять привычку из БД.
     """
 
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
+    permission_denied_message = "У вас нет прав на удаление этой привычки."
 
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if request.user != instance.owner:
-            raise PermissionDenied("У вас нет прав на удаление этой привычки.")
 
-        self.perform_destroy(instance)
-        return Response(status=204)
+@method_decorator(
+    name="post",
+    decorator=swagger_auto_schema(
+        operation_summary="Отметка выполнения привычки",
+    ),
+)
+class HabitCheckInAPIView(OwnerVisibilityMixin, GenericAPIView):
+    """
+    Отметка выполнения привычки за текущий день. Доступно только владельцу.
+    Отметка сначала попадает в буфер Redis и записывается в БД пачкой фоновой задачей,
+    повторная отметка за тот же день игнорируется. Возвращается 202.
+    """
+
+    queryset = Habit.objects.only("id", "owner")
+    serializer_class = HabitCompletionSerializer
+    permission_classes = [IsAuthenticated]
+    permission_denied_message = "У Вас нет прав отмечать выполнение этой привычки."
+
+    def post(self, request, *args, **kwargs):
+        habit = self.get_object()
+        completion = HabitCompletion(
+            habit=habit, day=timezone.localdate(), completed_at=timezone.now()
+        )
+        record_checkin(habit.pk, completion.day, completion.completed_at)
+        serializer = self.get_serializer(completion)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+@method_decorator(
+    name="post",
+    decorator=swagger_auto_schema(
+        operation_summary="Добавление публичной привычки в свой список",
+    ),
+)
+class HabitAdoptAPIView(GenericAPIView):
+    """
+    Копирует публичную привычку другого пользователя в список текущего пользователя.
+    Требуются авторизация. Копия непубличная и начинается с сегодняшнего дня,
+    повторное добавление той же привычки возвращает 400. Возвращается 201 с копией.
+    """
+
+    queryset = Habit.objects.filter(is_public=True, is_active=True).select_related(
+        "associated_habit"
+    )
+    serializer_class = HabitSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        habit = adopt_habit(self.get_object(), request.user)
+        serializer = self.get_serializer(habit)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        operation_summary="Статистика выполнения привычки",
+    ),
+)
+class HabitStatsAPIView(OwnerVisibilityMixin, GenericAPIView):
+    """
+    Статистика выполнения привычки за год (?year=, по умолчанию текущий): текущая и
+    самая длинная серия в периодах привычки, доля выполненных периодов и число
+    выполнений по дням недели. Считается по двум строкам календаря (год и предыдущий).
+    Доступна владельцу, а для публичной привычки - всем авторизованным пользователям.
+    """
+
+    queryset = Habit.objects.only("id", "owner", "periodicity", "date_deadline")
+    allow_public = True
+    permission_denied_message = "У Вас нет прав просматривать статистику этой привычки."
+
+    def get(self, request, *args, **kwargs):
+        habit = self.get_object()
+        today = timezone.localdate()
+        year = serializers.IntegerField(
+            min_value=2000, max_value=today.year
+        ).run_validation(request.query_params.get("year", today.year))
+
+        calendars = dict(
+            HabitCalendar.objects.filter(
+                habit=habit, year__in=(year - 1, year)
+            ).values_list("year", "bits")
+        )
+        return Response(get_habit_stats(habit, calendars, year, today))
@@ -0,0 +1,78 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+)
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from config.settings import TELEGRAM_WEBHOOK_SECRET
+from habits.services import CHECKIN_CALLBACK
+from habits.tasks import checkin_from_telegram, link_telegram_chat
+
+
+def defer(task, *args):
+    """Постановка задачи в очередь, не блокируя event loop на обращении к брокеру."""
+    return sync_to_async(task.delay, thread_sensitive=False)(*args)
+
+
+@csrf_exempt
+@require_POST
+async def telegram_webhook(request):
+    """
+    Вебхук бота. Обновления разбираются без обращений к БД: привязка чата и отметки
+    выполнения уходят в задачи Celery, а на нажатие кнопки Telegram получает
+    answerCallbackQuery прямо в ответе на вебхук, без отдельного запроса к Bot API.
+    """
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not TELEGRAM_WEBHOOK_SECRET or not constant_time_compare(
+        secret, TELEGRAM_WEBHOOK_SECRET
+    ):
+        return HttpResponseForbidden()
+    try:
+        update = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest()
+    if not isinstance(update, dict):
+        return HttpResponseBadRequest()
+
+    if "callback_query" in update:
+        return await handle_callback(update["callback_query"])
+    if "message" in update:
+        await handle_message(update["message"])
+    return HttpResponse()
+
+
+async def handle_message(message):
+    """Команда /start <token> из ссылки t.me/<бот>?start=<token> привязывает чат."""
+    chat = message.get("chat") or {}
+    command, _, token = (message.get("text") or "").partition(" ")
+    token = token.strip()
+    if chat.get("type") == "private" and command == "/start" and token:
+        await defer(link_telegram_chat, token, str(chat["id"]))
+
+
+async def handle_callback(callback):
+    """
+    Нажатие кнопки под напоминанием. День отметки фиксируется в момент нажатия,
+    владелец привычки проверяется в задаче по id нажавшего пользователя.
+    """
+    answer = {"method": "answerCallbackQuery", "callback_query_id": callback.get("id")}
+    action, _, habit_id = (callback.get("data") or "").partition(":")
+    if action == CHECKIN_CALLBACK and habit_id.isdigit():
+        now = timezone.now()
+        await defer(
+            checkin_from_telegram,
+            int(habit_id),
+            str(callback["from"]["id"]),
+            timezone.localdate(now).isoformat(),
+            now.isoformat(),
+        )
+        answer["text"] = "Выполнение отмечено"
+    return JsonResponse(answer)
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from config.settings import (
+    AUTH_USER_CACHE_TTL,
+    AUTH_USER_LOCAL_SIZE,
+    AUTH_USER_LOCAL_TTL,
+)
+from user.models import User
+
+PREFIX = "auth_user"
+
+# Пароль в кэш не попадает: у восстановленного пользователя это отложенное поле,
+# оно дочитывается из БД при обращении и не перезаписывается при save()
+CACHED_FIELDS = [
+    field.attname for field in User._meta.concrete_fields if field.name != "password"
+]
+
+
+class LocalUserCache:
+    """LRU пользователей в памяти процесса с коротким TTL, общий для потоков."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return values
+
+    def set(self, key, values):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalUserCache(AUTH_USER_LOCAL_SIZE, AUTH_USER_LOCAL_TTL)
+
+
+def get_generation_key(user_id):
+    return f"{PREFIX}:{user_id}:generation"
+
+
+def invalidate_cached_user(user_id):
+    """
+    Сброс закэшированного пользователя: сдвиг поколения делает недействительными
+    его записи в общем кэше для всех токенов, LRU этого процесса очищается сразу,
+    в остальных процессах запись живет не дольше AUTH_USER_LOCAL_TTL.
+    """
+    user_id = str(user_id)
+    local_cache.discard_user(user_id)
+    try:
+        cache.incr(get_generation_key(user_id))
+    except ValueError:
+        cache.set(get_generation_key(user_id), 2, None)
+
+
+def build_user(values):
+    return User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без SELECT пользователя на каждый запрос. Пользователь ищется
+    в LRU процесса, затем в общем кэше (Redis) по id и iat токена, и только потом в БД.
+    Записи сбрасываются при сохранении и удалении пользователя (смена пароля,
+    деактивация), неактивный или удаленный пользователь в кэш не попадает.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        issued_at = validated_token.get("iat")
+        # Проверка отзыва по хешу пароля требует актуального пароля из БД
+        if user_id is None or issued_at is None or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        key = (str(user_id), issued_at)
+        values = local_cache.get(key)
+        if values is None:
+            values = self.get_shared_values(validated_token, *key)
+            local_cache.set(key, values)
+        return build_user(values)
+
+    def get_shared_values(self, validated_token, user_id, issued_at):
+        generation_key = get_generation_key(user_id)
+        entry_key = f"{PREFIX}:{user_id}:{issued_at}"
+        # Поколение читается до БД: если пользователь изменится, пока он загружается,
+        # запись уйдет в кэш со старым поколением и не будет использована
+        cached = cache.get_many([generation_key, entry_key])
+        generation = cached.get(generation_key, 1)
+        entry = cached.get(entry_key)
+        if entry is not None and entry["generation"] == generation:
+            return entry["values"]
+
+        user = super().get_user(validated_token)
+        values = tuple(getattr(user, attname) for attname in CACHED_FIELDS)
+        timeout = min(AUTH_USER_CACHE_TTL, validated_token["exp"] - int(time.time()))
+        if timeout > 0:
+            cache.set(entry_key, {"generation": generation, "values": values}, timeout)
+        return values
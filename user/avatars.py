@@ -0,0 +1,85 @@
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from config.settings import AVATAR_THUMBNAIL_SIZES
+from user.authentication import invalidate_cached_user
+from user.models import User
+
+logger = logging.getLogger(__name__)
+
+# Формат, расширение и параметры сохранения; WebP - основной, JPEG - для старых клиентов
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+def get_thumbnail_directory(user_id, name):
+    return f"{os.path.dirname(name)}/thumbnails/{user_id}"
+
+
+def open_avatar(storage, name):
+    """Исходник в RGB с учетом поворота из EXIF, прозрачный фон заменяется белым."""
+    with storage.open(name) as file, Image.open(file) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе, не крупнее нужного
+        largest = max(AVATAR_THUMBNAIL_SIZES.values())
+        image.draft("RGB", (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image.convert("RGB")
+
+
+def build_thumbnails(user_id, name):
+    """
+    Квадратные миниатюры аватара всех размеров AVATAR_THUMBNAIL_SIZES в WebP и JPEG.
+    Миниатюры записываются пользователю, только если аватар не сменился за время
+    обработки; файлы прежних миниатюр удаляются. Возвращает {размер: {формат: путь}}
+    или None, если аватар сменился или файл не удалось прочитать как изображение.
+    """
+    storage = User._meta.get_field("avatar").storage
+    try:
+        image = open_avatar(storage, name)
+    except (OSError, Image.DecompressionBombError):
+        logger.warning("Не удалось построить миниатюры аватара %s", name, exc_info=True)
+        return None
+
+    directory = get_thumbnail_directory(user_id, name)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    thumbnails = {}
+    for size, pixels in AVATAR_THUMBNAIL_SIZES.items():
+        thumbnail = ImageOps.fit(image, (pixels, pixels), Image.Resampling.LANCZOS)
+        thumbnails[size] = {}
+        for extension, (image_format, options) in THUMBNAIL_FORMATS.items():
+            buffer = BytesIO()
+            thumbnail.save(buffer, image_format, **options)
+            # Имя постоянное: повторная обработка того же аватара перезаписывает файл
+            path = f"{directory}/{stem}-{pixels}.{extension}"
+            storage.delete(path)
+            thumbnails[size][extension] = storage.save(
+                path, ContentFile(buffer.getvalue())
+            )
+
+    paths = {path for variants in thumbnails.values() for path in variants.values()}
+    updated = User.objects.filter(pk=user_id, avatar=name).update(
+        avatar_thumbnails=thumbnails
+    )
+    if not updated:
+        for path in paths:
+            storage.delete(path)
+        return None
+
+    # update() не вызывает post_save, кэш аутентификации сбрасывается явно
+    invalidate_cached_user(user_id)
+    _, files = storage.listdir(directory)
+    for file in files:
+        if f"{directory}/{file}" not in paths:
+            storage.delete(f"{directory}/{file}")
+    return thumbnails
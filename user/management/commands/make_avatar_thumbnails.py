@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from user.models import User
+from user.tasks import make_avatar_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Ставит в очередь построение миниатюр для аватаров, загруженных до появления "
+        "миниатюр (или всех аватаров с --all, например после смены размеров)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Перестроить миниатюры всех аватаров"
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar="").exclude(avatar__isnull=True)
+        if not options["all"]:
+            users = users.filter(avatar_thumbnails={})
+        queued = 0
+        for user_id, name in users.values_list("id", "avatar").iterator():
+            make_avatar_thumbnails.delay(user_id, name)
+            queued += 1
+        self.stdout.write(f"Поставлено в очередь: {queued}")
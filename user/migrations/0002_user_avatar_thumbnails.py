@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Пути к уменьшенным копиям аватара по размерам и форматам",
+                verbose_name="Миниатюры аватара",
+            ),
+        ),
+    ]
@@ -28,6 +28,13 @@ class User(AbstractUser):
         null=True,
         blank=True,
     )
+    avatar_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Миниатюры аватара",
+        help_text="Пути к уменьшенным копиям аватара по размерам и форматам",
+    )
     token = models.CharField(max_length=50, verbose_name="Токен", null=True, blank=True)
     chat_id = models.CharField(
         max_length=50,
@@ -48,8 +55,50 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
-    @property
-    def avatar_url(self):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Имя файла из БД нужно, чтобы заметить смену аватара
+        instance._loaded_avatar = instance.__dict__.get("avatar")
+        return instance
+
+    def avatar_changed(self):
+        if "avatar" not in self.__dict__:
+            # Отложенное поле не сохраняется и не могло измениться
+            return False
+        return (self.avatar.name or "") != (getattr(self, "_loaded_avatar", "") or "")
+
+    def save(self, *args, **kwargs):
+        self._avatar_changed = self.avatar_changed()
+        if self._avatar_changed:
+            # Миниатюры старого аватара больше не подходят, новые построит задача
+            self.avatar_thumbnails = {}
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "avatar_thumbnails"}
+        super().save(*args, **kwargs)
+        if "avatar" in self.__dict__:
+            self._loaded_avatar = self.avatar.name
+
+    def get_avatar_url(self, size="small", image_format="webp"):
+        """URL миниатюры аватара; пока миниатюр нет - исходный файл."""
+        path = self.avatar_thumbnails.get(size, {}).get(image_format)
+        if path:
+            return self.avatar.storage.url(path)
         if self.avatar and hasattr(self.avatar, "url"):
             return self.avatar.url
         return "media/default_avatar.png"
+
+    def get_avatar_variants(self):
+        """URL всех миниатюр: {размер: {формат: url}}."""
+        storage = self.avatar.storage
+        return {
+            size: {
+                image_format: storage.url(path) for image_format, path in paths.items()
+            }
+            for size, paths in self.avatar_thumbnails.items()
+        }
+
+    @property
+    def avatar_url(self):
+        return self.get_avatar_url()
@@ -1,8 +1,42 @@
+from rest_framework.fields import Field
 from rest_framework.serializers import ModelSerializer
 
 from user.models import User
 
 
+class AvatarURLField(Field):
+    """
+    URL миниатюры аватара заданного размера (WebP), пока миниатюр нет - исходного файла.
+    Как и ImageField, при наличии запроса в контексте отдает абсолютный URL.
+    """
+
+    def __init__(self, size="small", **kwargs):
+        self.size = size
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def build_url(self, url):
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, user):
+        return self.build_url(user.get_avatar_url(self.size))
+
+
+class AvatarVariantsField(AvatarURLField):
+    """Все миниатюры аватара: {размер: {формат: url}}."""
+
+    def to_representation(self, user):
+        return {
+            size: {
+                image_format: self.build_url(url)
+                for image_format, url in formats.items()
+            }
+            for size, formats in user.get_avatar_variants().items()
+        }
+
+
 class UserRegisterSerializer(ModelSerializer):
     class Meta:
         model = User
@@ -10,32 +44,58 @@ class UserRegisterSerializer(ModelSerializer):
 
 
 class UserSerializers(ModelSerializer):
+    """
+    Профиль пользователя. Пароль, токен привязки телеграма и права доступа
+    (is_staff, is_superuser, группы) не отдаются и не меняются через API.
+    """
+
+    avatar_url = AvatarURLField(size="medium")
+    avatars = AvatarVariantsField()
 
     class Meta:
         model = User
-        fields = "__all__"
-
-    def get_field_names(self, declared_fields, info):
-        expanded_fields = super().get_field_names(declared_fields, info)
-        return expanded_fields + self.Meta.extra_fields
+        fields = [
+            "id",
+            "email",
+            "first_name",
+            "last_name",
+            "phone_number",
+            "country",
+            "avatar",
+            "avatar_url",
+            "avatars",
+            "chat_id",
+            "is_active",
+            "date_joined",
+            "last_login",
+        ]
+        read_only_fields = ["id", "is_active", "date_joined", "last_login"]
 
 
 class UserPublicSerializer(ModelSerializer):
+    """Список пользователей: вместо исходного файла аватара - ссылки на миниатюры."""
+
+    avatar_url = AvatarURLField(size="small")
+    avatars = AvatarVariantsField()
 
     class Meta:
         model = User
-        fields = ["first_name", "country", "avatar"]
+        fields = ["first_name", "country", "avatar_url", "avatars"]
         read_only_fields = fields
 
 
 class UserDetailSerializer(ModelSerializer):
+    avatar_url = AvatarURLField(size="medium")
+    avatars = AvatarVariantsField()
 
     class Meta:
         model = User
         fields = [
             "email",
-            "phone",
+            "phone_number",
             "country",
             "avatar",
+            "avatar_url",
+            "avatars",
             "chat_id",
         ]
@@ -0,0 +1,29 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import invalidate_cached_user
+from user.models import User
+from user.tasks import make_avatar_thumbnails
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Сброс пользователя в кэше JWT-аутентификации при любом изменении или удалении.
+    Сброс идет после коммита: иначе параллельный запрос прочитал бы из БД еще
+    активного пользователя и закэшировал его под новым поколением.
+    """
+    transaction.on_commit(partial(invalidate_cached_user, instance.pk))
+
+
+@receiver(post_save, sender=User)
+def schedule_avatar_thumbnails(sender, instance, **kwargs):
+    """Новый аватар уходит на построение миниатюр после фиксации транзакции."""
+    if getattr(instance, "_avatar_changed", False) and instance.avatar:
+        transaction.on_commit(
+            lambda: make_avatar_thumbnails.delay(instance.pk, instance.avatar.name)
+        )
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from user import avatars
+
+
+@shared_task(ignore_result=True)
+def make_avatar_thumbnails(user_id, name):
+    """Построение миниатюр загруженного аватара пользователя."""
+    avatars.build_thumbnails(user_id, name)
@@ -1,3 +1,290 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.tasks import link_telegram_chat
+from user.authentication import (
+    CachedJWTAuthentication,
+    get_generation_key,
+    local_cache,
+)
+from user.avatars import build_thumbnails
+from user.models import User
+from user.serializers import UserPublicSerializer
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    """Тесты кэширования пользователя при JWT-аутентификации"""
+
+    def setUp(self):
+        local_cache.clear()
+        cache.clear()
+        self.user = User.objects.create(email="auth@example.com", is_active=True)
+        self.user.set_password("password")
+        self.user.save()
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = CachedJWTAuthentication()
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token or self.token}"
+        )
+        user, _ = self.authentication.authenticate(request)
+        return user
+
+    def test_repeated_requests_skip_database(self):
+        with CaptureQueriesContext(connection) as first:
+            user = self.authenticate()
+        self.assertEqual(len(first), 1)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, "auth@example.com")
+
+        with CaptureQueriesContext(connection) as second:
+            user = self.authenticate()
+        self.assertEqual(len(second), 0)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_shared_cache_used_by_other_processes(self):
+        self.authenticate()
+        local_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            user = self.authenticate()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user.email, "auth@example.com")
+
+    def test_deactivation_invalidates_cache(self):
+        self.authenticate()
+        generation = cache.get(get_generation_key(self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # До коммита поколение не сдвигается: параллельный запрос, прочитавший
+            # еще активного пользователя, не закэширует его под новым поколением
+            self.assertEqual(cache.get(get_generation_key(self.user.pk)), generation)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_user_is_rejected(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_generation_bump_from_other_process(self):
+        self.authenticate()
+        # Другой процесс сбросил пользователя: локальный LRU здесь жив до TTL
+        cache.set(get_generation_key(self.user.pk), 2, None)
+        User.objects.filter(pk=self.user.pk).update(country="Россия")
+        local_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            user = self.authenticate()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(user.country, "Россия")
+
+    def test_telegram_link_invalidates_cache(self):
+        User.objects.filter(pk=self.user.pk).update(token="link-token")
+        self.authenticate()
+
+        with patch("habits.tasks.send_telegram_message"):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                link_telegram_chat("link-token", "555")
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertEqual(self.authenticate().chat_id, "555")
+
+    def test_cached_user_keeps_password(self):
+        user = self.authenticate()
+        self.assertIn("password", user.get_deferred_fields())
+
+        user.country = "Россия"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.country, "Россия")
+        self.assertTrue(self.user.check_password("password"))
+
+    def test_tokens_are_cached_separately(self):
+        self.authenticate()
+        other_token = AccessToken.for_user(self.user)
+        other_token["iat"] = self.token["iat"] - 1
+
+        with CaptureQueriesContext(connection) as queries:
+            self.authenticate(other_token)
+        self.assertEqual(len(queries), 1)
+
+
+def make_image(size=(1200, 800), image_format="JPEG", mode="RGB"):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class AvatarThumbnailTestCase(APITestCase):
+    """Тесты построения миниатюр аватара"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create(email="avatar@example.com", first_name="Аня")
+
+    def upload(self, content=None, name="photo.jpg"):
+        with patch("user.signals.make_avatar_thumbnails.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.avatar = SimpleUploadedFile(name, content or make_image())
+                self.user.save()
+        return delay
+
+    def test_upload_schedules_thumbnails(self):
+        delay = self.upload()
+        delay.assert_called_once_with(self.user.pk, self.user.avatar.name)
+
+        # Изменение других полей миниатюры не трогает
+        with patch("user.signals.make_avatar_thumbnails.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.get(pk=self.user.pk).save()
+        delay.assert_not_called()
+
+    def test_thumbnails_are_built(self):
+        self.upload()
+        thumbnails = build_thumbnails(self.user.pk, self.user.avatar.name)
+
+        self.assertEqual(set(thumbnails), {"small", "medium"})
+        for size, pixels in (("small", 64), ("medium", 256)):
+            for extension, image_format in (("webp", "WEBP"), ("jpeg", "JPEG")):
+                with default_storage.open(thumbnails[size][extension]) as file:
+                    with Image.open(file) as image:
+                        self.assertEqual(image.size, (pixels, pixels))
+                        self.assertEqual(image.format, image_format)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_thumbnails, thumbnails)
+        self.assertTrue(self.user.avatar_url.endswith("photo-64.webp"))
+        self.assertTrue(
+            self.user.get_avatar_url("medium", "jpeg").endswith("photo-256.jpeg")
+        )
+
+    def test_transparent_png(self):
+        self.upload(make_image((300, 300), "PNG", "RGBA"), name="logo.png")
+        thumbnails = build_thumbnails(self.user.pk, self.user.avatar.name)
+        with default_storage.open(thumbnails["small"]["jpeg"]) as file:
+            self.assertEqual(Image.open(file).size, (64, 64))
+
+    def test_new_avatar_replaces_thumbnails(self):
+        self.upload()
+        old = build_thumbnails(self.user.pk, self.user.avatar.name)
+        old_name = self.user.avatar.name
+
+        self.upload(name="second.jpg")
+        self.assertEqual(self.user.avatar_thumbnails, {})
+        # Задача по старому аватару опоздала: миниатюры не записываются
+        self.assertIsNone(build_thumbnails(self.user.pk, old_name))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_thumbnails, {})
+
+        new = build_thumbnails(self.user.pk, self.user.avatar.name)
+        self.assertFalse(default_storage.exists(old["small"]["webp"]))
+        self.assertTrue(default_storage.exists(new["small"]["webp"]))
+
+    def test_broken_image(self):
+        self.upload(b"not an image")
+        with self.assertLogs("user.avatars", "WARNING"):
+            self.assertIsNone(build_thumbnails(self.user.pk, self.user.avatar.name))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_thumbnails, {})
+        self.assertTrue(self.user.avatar_url.endswith("photo.jpg"))
+
+    def test_public_list_returns_thumbnails(self):
+        self.upload()
+        serializer = UserPublicSerializer(self.user)
+        self.assertNotIn("avatar", serializer.data)
+        self.assertTrue(serializer.data["avatar_url"].endswith("photo.jpg"))
+        self.assertEqual(serializer.data["avatars"], {})
+
+        build_thumbnails(self.user.pk, self.user.avatar.name)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("user:user-list"))
+        data = response.data["results"][0]
+        self.assertTrue(data["avatar_url"].startswith("http://testserver/media/"))
+        self.assertTrue(data["avatar_url"].endswith("photo-64.webp"))
+        self.assertTrue(data["avatars"]["medium"]["jpeg"].endswith("photo-256.jpeg"))
+
+    def test_backfill_command(self):
+        self.upload()
+        User.objects.create(email="no-avatar@example.com")
+        with patch("user.tasks.make_avatar_thumbnails.delay") as delay:
+            call_command("make_avatar_thumbnails", stdout=open(os.devnull, "w"))
+        delay.assert_called_once_with(self.user.pk, self.user.avatar.name)
+
+
+class UserProfileAPITestCase(APITestCase):
+    """Тесты профиля пользователя"""
+
+    def setUp(self):
+        self.user = User.objects.create(email="profile@example.com", token="secret")
+        self.user.set_password("password")
+        self.user.save()
+        self.staff = User.objects.create(email="staff@example.com", is_staff=True)
+
+    def test_retrieve_hides_credentials(self):
+        # LoginRequiredMixin проверяет пользователя сессии Django
+        self.client.force_login(self.staff)
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(reverse("user:user-detail", args=[self.user.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["email"], "profile@example.com")
+        self.assertIn("avatar_url", response.data)
+        for field in (
+            "password",
+            "token",
+            "is_superuser",
+            "is_staff",
+            "groups",
+            "user_permissions",
+        ):
+            self.assertNotIn(field, response.data)
+
+    def test_update_ignores_permissions(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(
+            reverse("user:user-update", args=[self.user.pk]),
+            {
+                "country": "Россия",
+                "is_superuser": True,
+                "is_staff": True,
+                "password": "changed",
+                "token": "changed",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.country, "Россия")
+        self.assertFalse(self.user.is_superuser)
+        self.assertFalse(self.user.is_staff)
+        self.assertTrue(self.user.check_password("password"))
+        self.assertEqual(self.user.token, "secret")